@@ -1,5 +1,7 @@
 import csv
-from pydriller import Repository
+import sys
+
+from git_log_miner import mine_commits
 
 # Target repository
 repo_url = "https://github.com/bee-san/Ciphey"
@@ -15,13 +17,16 @@ keywords = [
     "workaround ", "workaround", "break", "break", "stop", "stop"
 ]
 
-with open(output_file, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["hash", "message", "parents", "is_merge", "modified_files"])
 
-    for commit in Repository(repo_url).traverse_commits():
-        msg = commit.msg.lower()
-        if any(kw in msg for kw in keywords):
+def is_bug_fix(message):
+    msg = message.lower()
+    return any(kw in msg for kw in keywords)
+
+
+def mine_with_pydriller(repo, writer):
+    from pydriller import Repository  # here, so importing is_bug_fix does not need pydriller
+    for commit in Repository(repo).traverse_commits():
+        if is_bug_fix(commit.msg):
             writer.writerow([
                 commit.hash,
                 commit.msg,
@@ -30,4 +35,35 @@ with open(output_file, "w", newline="", encoding="utf-8") as f:
                 [m.new_path for m in commit.modified_files]
             ])
 
-print(f"Done! Bug-fixing commits stored in {output_file}")
+
+def mine_with_git_log(repo_path, writer):
+    """Fast path: needs a local clone, skips pydriller's per-file diff parsing"""
+    for commit in mine_commits(repo_path):
+        if is_bug_fix(commit.message):
+            writer.writerow([
+                commit.hash,
+                commit.message,
+                commit.parents,
+                len(commit.parents) > 1,
+                [f.path for f in commit.files]
+            ])
+
+
+def main():
+    # Usage: python bug_fixing.py [--fast <path-to-local-clone>]
+    fast = len(sys.argv) > 2 and sys.argv[1] == "--fast"
+
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["hash", "message", "parents", "is_merge", "modified_files"])
+
+        if fast:
+            mine_with_git_log(sys.argv[2], writer)
+        else:
+            mine_with_pydriller(repo_url, writer)
+
+    print(f"Done! Bug-fixing commits stored in {output_file}")
+
+
+if __name__ == "__main__":
+    main()
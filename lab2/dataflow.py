@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Row-level incremental dataflow over the lab2 stages.
+
+    bug_fixing -> diffs_gen -> pred_gen -> rec_gen -> rq_analysis
+
+Every file-level row carries a stable key (commit hash + file path). For
+each stage the state file records, per key, the content hash of the
+stage's input. A refresh only runs a stage on keys that are new or whose
+upstream hash changed, and the rq_analysis counters are patched row by row
+instead of being recomputed. The model calls and the pydriller diff
+extraction, which dominate runtime, therefore scale with the number of new
+commits; only the CSV rewrite at the end touches every row.
+
+Usage: python dataflow.py [path-to-local-clone]
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+
+from bug_fixing import is_bug_fix
+from diffs_gen import FIELDNAMES as DIFF_FIELDS, extract_rows, repo_path
+from git_log_miner import mine_commits
+from pred_gen import predict_row
+from rec_gen import rectify_row
+from rq_analysis import commit_contribution, row_contribution, summarize, print_results, make_report
+
+state_file = "dataflow_state.json"
+bug_csv = "bug_fixing_commits.csv"
+diffs_csv = "commit_diffs.csv"
+pred_csv = "commit_predictions.csv"
+report_file = "Lab2_Report_Ciphey.md"
+
+PRED_FIELD = "LLM Inference (fix type)"
+REC_FIELD = "Rectified Message"
+
+REPO_STATS = {
+    'Repository': 'Ciphey',
+    'GitHub Stars': '4.4k+',
+    'Forks': '240+',
+    'Contributors': '50+',
+    'Primary Language': 'Python',
+    'License': 'MIT',
+    'Age': '5+ years'
+}
+
+
+def content_hash(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(str(part).encode("utf-8", errors="replace"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _read_text(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return ""
+
+
+# ---------------- Keyed tables ---------------- #
+
+class KeyedTable:
+    """A CSV held as an ordered {row key: row} mapping"""
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.rows = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(f)
+                for name in reader.fieldnames or []:
+                    if name not in self.fieldnames:
+                        self.fieldnames.append(name)
+                seen = Counter()
+                for row in reader:
+                    self.rows[self._key(row, seen)] = row
+
+    @staticmethod
+    def _key(row, seen):
+        if row.get("File Path"):
+            return f'{row["Commit Hash"]}:{row["File Path"]}'
+        # Rows written before "File Path" existed only know the file name,
+        # which can repeat within a commit: number the repeats.
+        base = f'{row["Commit Hash"]}:{row["File Name"]}'
+        seen[base] += 1
+        return base if seen[base] == 1 else f"{base}#{seen[base]}"
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, quoting=csv.QUOTE_ALL,
+                                    restval="", extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.rows.values())
+
+
+def load_state():
+    if os.path.exists(state_file):
+        with open(state_file, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def save_state(state):
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+# ---------------- Aggregates ---------------- #
+
+def _patch(state, bucket, key, new_counts):
+    """Replace one row's contribution to the aggregate counters"""
+    agg = Counter(state["aggregates"])
+    old = state["contributions"][bucket].get(key)
+    if old:
+        agg.subtract(old)
+    agg.update(new_counts)
+    state["contributions"][bucket][key] = dict(new_counts)
+    state["aggregates"] = dict(agg)
+
+
+def _row_counts(row):
+    return row_contribution(row.get("Commit Message"), row.get(PRED_FIELD),
+                            row.get(REC_FIELD), row.get("File Name"))
+
+
+# ---------------- Bootstrap ---------------- #
+
+def bootstrap(diffs, preds):
+    """
+    Adopt the CSVs produced by the batch scripts as the starting state, so
+    the first incremental run does not redo every row.
+    """
+    print(">> No dataflow state found, bootstrapping from existing CSVs...")
+    state = {"last_commit": "", "diffs": {}, "pred": {}, "rec": {},
+             "aggregates": {}, "contributions": {"rows": {}, "commits": {}}}
+
+    for key, row in diffs.rows.items():
+        state["diffs"][key] = content_hash(
+            row["Commit Message"],
+            _read_text(row["Source Code Before File Path"]),
+            _read_text(row["Source Code After File Path"]),
+            _read_text(row["Diff File Path"]),
+        )
+        state["last_commit"] = row["Commit Hash"]
+
+    for key, row in preds.rows.items():
+        up = state["diffs"].get(key)
+        if up is None:
+            continue
+        pred_out = content_hash(up, row.get(PRED_FIELD, ""))
+        state["pred"][key] = {"up": up, "out": pred_out}
+        state["rec"][key] = {"up": pred_out, "out": content_hash(pred_out, row.get(REC_FIELD, ""))}
+        _patch(state, "rows", key, _row_counts(row))
+
+    if os.path.exists(bug_csv):
+        with open(bug_csv, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for commit_hash, message, _, is_merge, files in reader:
+                _patch(state, "commits", commit_hash, commit_contribution(message, is_merge, files))
+    return state
+
+
+# ---------------- Stages ---------------- #
+
+def stage_mine(state, repo):
+    """New commits since the last refresh; bug fixes are appended to bug_fixing_commits.csv"""
+    rev_range = f'{state["last_commit"]}..HEAD' if state["last_commit"] else None
+    new_commits = list(mine_commits(repo, rev_range=rev_range))
+
+    fixes = [c for c in new_commits if is_bug_fix(c.message)
+             and c.hash not in state["contributions"]["commits"]]
+    if fixes:
+        with open(bug_csv, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for c in fixes:
+                files = [s.path for s in c.files]
+                writer.writerow([c.hash, c.message, c.parents, len(c.parents) > 1, files])
+                _patch(state, "commits", c.hash,
+                       commit_contribution(c.message, len(c.parents) > 1, str(files)))
+    print(f"   mine: {len(new_commits)} new commits, {len(fixes)} bug fixes")
+    return [c.hash for c in new_commits]
+
+
+def stage_diffs(state, repo, diffs, new_hashes):
+    if not new_hashes:
+        return 0
+    changed = 0
+    for row, before, after, diff in extract_rows(repo, only_commits=new_hashes):
+        key = f'{row["Commit Hash"]}:{row["File Path"]}'
+        digest = content_hash(row["Commit Message"], before, after, diff)
+        if state["diffs"].get(key) != digest:
+            diffs.rows[key] = row
+            state["diffs"][key] = digest
+            changed += 1
+    print(f"   diffs: {changed} rows written")
+    return changed
+
+
+def stage_pred(state, diffs, preds):
+    changed = 0
+    for key, row in diffs.rows.items():
+        up = state["diffs"].get(key)
+        if up is None or state["pred"].get(key, {}).get("up") == up:
+            continue
+        out_row = dict(preds.rows.get(key, {}), **row)
+        out_row[PRED_FIELD] = predict_row(row)
+        preds.rows[key] = out_row
+        state["pred"][key] = {"up": up, "out": content_hash(up, out_row[PRED_FIELD])}
+        changed += 1
+    print(f"   pred: {changed} rows classified")
+    return changed
+
+
+def stage_rec(state, preds):
+    changed = 0
+    for key, row in preds.rows.items():
+        up = state["pred"].get(key, {}).get("out")
+        if up is None or state["rec"].get(key, {}).get("up") == up:
+            continue
+        row[REC_FIELD] = rectify_row(row)
+        state["rec"][key] = {"up": up, "out": content_hash(up, row[REC_FIELD])}
+        _patch(state, "rows", key, _row_counts(row))
+        changed += 1
+    print(f"   rec: {changed} rows rectified")
+    return changed
+
+
+def refresh(repo):
+    diffs = KeyedTable(diffs_csv, DIFF_FIELDS)
+    preds = KeyedTable(pred_csv, DIFF_FIELDS + [PRED_FIELD, REC_FIELD])
+    state = load_state() or bootstrap(diffs, preds)
+
+    print(">> Refreshing lab2 dataflow...")
+    new_hashes = stage_mine(state, repo)
+    stage_diffs(state, repo, diffs, new_hashes)
+    predicted = stage_pred(state, diffs, preds)
+    rectified = stage_rec(state, preds)
+
+    if new_hashes:
+        state["last_commit"] = new_hashes[-1]
+    if new_hashes or predicted or rectified:
+        diffs.save()
+        preds.save()
+    save_state(state)
+
+    results = summarize(Counter(state["aggregates"]))
+    print_results(results)
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write(make_report(results, REPO_STATS))
+    print(f"\n Report generated: {report_file}")
+
+
+if __name__ == "__main__":
+    refresh(sys.argv[1] if len(sys.argv) > 1 else repo_path)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Structured unified-diff parser.
+
+Each diff becomes hunk records (old/new start and length) and line spans
+(contiguous runs of added or removed lines) held in NumPy arrays, with
+character offsets back into the diff text. Many diffs are concatenated into
+a DiffCorpus so per-diff and per-commit statistics are computed with array
+operations instead of re-reading the text.
+"""
+
+import csv
+import os
+import re
+import sys
+
+import numpy as np
+
+input_csv = "commit_diffs.csv"
+diff_column = "Diff File Path"
+index_file = "diff_index.npz"
+output_csv = "diff_stats.csv"
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+REMOVED = -1
+ADDED = 1
+
+# Column layout of the raw arrays
+HUNK_FIELDS = ["old_start", "old_len", "new_start", "new_len", "offset"]
+SPAN_FIELDS = ["hunk", "kind", "line", "length", "start", "end"]
+
+
+class ParsedDiff:
+    """
+    hunks: int64 array (n_hunks, 5) -> HUNK_FIELDS
+    spans: int64 array (n_spans, 6) -> SPAN_FIELDS
+
+    `line` is an old-file line number for removed spans and a new-file line
+    number for added spans; start/end are character offsets into `text`.
+    """
+
+    def __init__(self, text, hunks, spans):
+        self.text = text
+        self.hunks = hunks
+        self.spans = spans
+
+    def span_text(self, i):
+        return self.text[self.spans[i, 4]:self.spans[i, 5]]
+
+    def lines(self, kind):
+        """All old (kind=REMOVED) or new (kind=ADDED) line numbers touched"""
+        sel = self.spans[self.spans[:, 1] == kind]
+        if not len(sel):
+            return np.zeros(0, dtype=np.int64)
+        starts = np.repeat(sel[:, 2], sel[:, 3])
+        steps = np.arange(len(starts)) - np.repeat(np.cumsum(sel[:, 3]) - sel[:, 3], sel[:, 3])
+        return starts + steps
+
+
+def parse_diff(text):
+    """Parse one file's unified diff (with or without ---/+++ headers)"""
+    hunks = []
+    spans = []
+    current = None  # open span: [hunk, kind, line, length, start, end]
+    in_hunk = False
+    old_line = new_line = 0
+    pos = 0
+
+    lines = text.split("\n")
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        start = pos
+        pos += len(line) + 1
+        marker = line[:1]
+
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            if match:
+                old_line, new_line = int(match.group(1)), int(match.group(3))
+                old_len = int(match.group(2)) if match.group(2) is not None else 1
+                new_len = int(match.group(4)) if match.group(4) is not None else 1
+                hunks.append([old_line, old_len, new_line, new_len, start])
+                in_hunk = True
+                current = None
+                continue
+
+        if not in_hunk or marker == "\\":
+            continue  # file headers, "Binary files differ", "\ No newline at end of file"
+
+        if marker in ("-", "+"):
+            kind = REMOVED if marker == "-" else ADDED
+            if current is None or current[1] != kind:
+                current = [len(hunks) - 1, kind, old_line if kind == REMOVED else new_line, 0, start, 0]
+                spans.append(current)
+            current[3] += 1
+            current[5] = min(pos, len(text))
+            if kind == REMOVED:
+                old_line += 1
+            else:
+                new_line += 1
+        elif marker == " " or (line == "" and i != last):
+            current = None
+            old_line += 1
+            new_line += 1
+        else:
+            in_hunk = False
+            current = None
+
+    return ParsedDiff(
+        text,
+        np.array(hunks, dtype=np.int64).reshape(-1, len(HUNK_FIELDS)),
+        np.array(spans, dtype=np.int64).reshape(-1, len(SPAN_FIELDS)),
+    )
+
+
+class DiffCorpus:
+    """
+    Many parsed diffs in flat arrays.
+
+    hunk_ptr / span_ptr are CSR-style offsets: diff i owns
+    hunks[hunk_ptr[i]:hunk_ptr[i+1]] and spans[span_ptr[i]:span_ptr[i+1]].
+    Span offsets stay relative to the diff's own text.
+    """
+
+    def __init__(self, hunks, spans, hunk_ptr, span_ptr):
+        self.hunks = hunks
+        self.spans = spans
+        self.hunk_ptr = hunk_ptr
+        self.span_ptr = span_ptr
+
+    @classmethod
+    def from_diffs(cls, parsed):
+        hunk_counts = [len(p.hunks) for p in parsed]
+        span_counts = [len(p.spans) for p in parsed]
+        hunk_ptr = np.concatenate([[0], np.cumsum(hunk_counts)]).astype(np.int64)
+        span_ptr = np.concatenate([[0], np.cumsum(span_counts)]).astype(np.int64)
+        hunks = np.concatenate([p.hunks for p in parsed] or [np.zeros((0, len(HUNK_FIELDS)), np.int64)])
+        spans = np.concatenate([p.spans for p in parsed] or [np.zeros((0, len(SPAN_FIELDS)), np.int64)])
+        return cls(hunks, spans, hunk_ptr, span_ptr)
+
+    def __len__(self):
+        return len(self.hunk_ptr) - 1
+
+    def save(self, path):
+        np.savez_compressed(path, hunks=self.hunks, spans=self.spans,
+                            hunk_ptr=self.hunk_ptr, span_ptr=self.span_ptr)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["hunks"], data["spans"], data["hunk_ptr"], data["span_ptr"])
+
+    def stats(self):
+        """
+        Per-diff statistics as a dict of arrays:
+        hunks, added, removed, changed and locality.
+
+        locality = max(added, removed) / extent of the changed lines, so 1.0
+        means the change is one contiguous block and values near 0 mean the
+        edits are scattered across the file. NaN for diffs with no changes.
+        """
+        n = len(self)
+        span_diff = np.repeat(np.arange(n), np.diff(self.span_ptr))
+        kind = self.spans[:, 1]
+        length = self.spans[:, 3]
+        line = self.spans[:, 2]
+
+        out = {"hunks": np.diff(self.hunk_ptr)}
+        extent = np.zeros(n, dtype=np.int64)
+        for name, k in (("added", ADDED), ("removed", REMOVED)):
+            sel = kind == k
+            out[name] = np.bincount(span_diff[sel], weights=length[sel], minlength=n).astype(np.int64)
+
+            first = np.full(n, np.iinfo(np.int64).max)
+            last = np.full(n, np.iinfo(np.int64).min)
+            np.minimum.at(first, span_diff[sel], line[sel])
+            np.maximum.at(last, span_diff[sel], line[sel] + length[sel])
+            has = out[name] > 0
+            extent[has] = np.maximum(extent[has], last[has] - first[has])
+
+        out["changed"] = out["added"] + out["removed"]
+        block = np.maximum(out["added"], out["removed"])
+        out["locality"] = np.divide(block, extent, out=np.full(n, np.nan), where=extent > 0)
+        return out
+
+
+def group_stats(stats, keys):
+    """Aggregate per-diff stats to per-key (e.g. per-commit) rows in one pass"""
+    uniq, first, inverse = np.unique(np.asarray(keys), return_index=True, return_inverse=True)
+    # Keep keys in order of first appearance (commit order) rather than sorted
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    uniq, inverse = uniq[order], rank[inverse.ravel()]
+    m = len(uniq)
+    grouped = {"files": np.bincount(inverse, minlength=m)}
+    for name in ("hunks", "added", "removed", "changed"):
+        grouped[name] = np.bincount(inverse, weights=stats[name], minlength=m).astype(np.int64)
+
+    valid = ~np.isnan(stats["locality"])
+    total = np.bincount(inverse[valid], weights=stats["locality"][valid], minlength=m)
+    count = np.bincount(inverse[valid], minlength=m)
+    grouped["locality"] = np.divide(total, count, out=np.full(m, np.nan), where=count > 0)
+    return uniq, grouped
+
+
+def main():
+    # Usage: python diff_parser.py [commit_diffs.csv]
+    source = sys.argv[1] if len(sys.argv) > 1 else input_csv
+
+    commits = []
+    parsed = []
+    with open(source, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            path = row.get(diff_column, "")
+            text = ""
+            if path and os.path.exists(path):
+                with open(path, encoding="utf-8", errors="replace") as diff_file:
+                    text = diff_file.read()
+            commits.append(row["Commit Hash"])
+            parsed.append(parse_diff(text))
+
+    corpus = DiffCorpus.from_diffs(parsed)
+    corpus.save(index_file)
+    print(f"✓ Parsed {len(corpus)} diffs ({len(corpus.hunks)} hunks, {len(corpus.spans)} spans) -> {index_file}")
+
+    uniq, grouped = group_stats(corpus.stats(), commits)
+    with open(output_csv, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(["Commit Hash", "Files", "Hunks", "Lines Added", "Lines Removed",
+                         "Lines Changed", "Change Locality"])
+        for i, commit in enumerate(uniq):
+            locality = grouped["locality"][i]
+            writer.writerow([commit, grouped["files"][i], grouped["hunks"][i], grouped["added"][i],
+                             grouped["removed"][i], grouped["changed"][i],
+                             "" if np.isnan(locality) else f"{locality:.4f}"])
+    print(f"✓ Per-commit diff statistics for {len(uniq)} commits saved to {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,22 +5,29 @@ from pydriller import Repository
 repo_path = "./Ciphey"  # change this to your local path where repo is cloned
 codes_dir = "codes"
 diffs_dir = "diffs"
-os.makedirs(codes_dir, exist_ok=True)
-os.makedirs(diffs_dir, exist_ok=True)
-
-with open('commit_diffs.csv', 'w', newline='', encoding='utf-8') as csvfile:
-    writer = csv.writer(csvfile, quoting=csv.QUOTE_ALL)
-    writer.writerow([
-        "Commit Hash",
-        "Commit Message",
-        "File Name",
-        "Source Code Before File Path",
-        "Source Code After File Path",
-        "Diff File Path"
-    ])
-
-    for commit in Repository(repo_path).traverse_commits():
-        
+
+FIELDNAMES = [
+    "Commit Hash",
+    "Commit Message",
+    "File Name",
+    "Source Code Before File Path",
+    "Source Code After File Path",
+    "Diff File Path",
+    "File Path"
+]
+
+
+def extract_rows(repo, only_commits=None):
+    """
+    Write before/after/diff files for every modified file and yield one
+    (row, before, after, diff) tuple per file. `only_commits` restricts the
+    traversal to the given hashes (used by the incremental dataflow).
+    """
+    os.makedirs(codes_dir, exist_ok=True)
+    os.makedirs(diffs_dir, exist_ok=True)
+
+    for commit in Repository(repo, only_commits=only_commits).traverse_commits():
+
         for mod in commit.modified_files:
             before = ""
             after = ""
@@ -41,8 +48,10 @@ with open('commit_diffs.csv', 'w', newline='', encoding='utf-8') as csvfile:
             except Exception:
                 diff = ""
 
-            # Create unique filenames for source codes and diff
-            base_filename = f"{commit.hash}_{mod.filename}"
+            # Create unique filenames for source codes and diff. The full path is
+            # used because one commit can touch several files with the same name.
+            file_path = mod.new_path or mod.old_path or mod.filename
+            base_filename = f"{commit.hash}_{file_path}"
             base_filename = base_filename.replace(os.sep, "_").replace("/", "_").replace("\\", "_")
             before_filename = f"{base_filename}_before.txt"
             after_filename = f"{base_filename}_after.txt"
@@ -59,11 +68,26 @@ with open('commit_diffs.csv', 'w', newline='', encoding='utf-8') as csvfile:
             with open(diff_path, 'w', encoding='utf-8') as diff_file:
                 diff_file.write(diff)
 
-            writer.writerow([
+            row = dict(zip(FIELDNAMES, [
                 commit.hash,
                 commit.msg,
                 mod.filename,
                 before_path,
                 after_path,
-                diff_path
-            ])
\ No newline at end of file
+                diff_path,
+                file_path
+            ]))
+            yield row, before, after, diff
+
+
+def main():
+    with open('commit_diffs.csv', 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+
+        for row, _, _, _ in extract_rows(repo_path):
+            writer.writerow(row)
+
+
+if __name__ == "__main__":
+    main()
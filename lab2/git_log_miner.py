@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Fast history miner built on a single streamed `git log --numstat -z` call.
+
+pydriller builds a full ModifiedFile (with a parsed diff) for every file of
+every commit. Bug-fix detection only needs hashes, messages, parents and the
+touched paths, so this miner reads them straight from git and yields
+lightweight records while the subprocess is still running.
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+# One record per commit / per touched file
+CommitRecord = namedtuple("CommitRecord", ["hash", "parents", "author", "timestamp", "message", "files"])
+FileStat = namedtuple("FileStat", ["path", "old_path", "added", "deleted"])
+
+# Header fields are separated by US (0x1f) and every commit starts with RS (0x1e),
+# so a header token can never be confused with a numstat token.
+RECORD_SEP = b"\x1e"
+FIELD_SEP = b"\x1f"
+LOG_FORMAT = "%x1e%H%x1f%P%x1f%an%x1f%at%x1f%B"
+
+CHUNK_SIZE = 1 << 16
+
+
+def _decode(raw):
+    return raw.decode("utf-8", errors="replace")
+
+
+def _count(raw):
+    """numstat prints '-' for binary files"""
+    return None if raw == b"-" else int(raw)
+
+
+def _parse_header(token):
+    commit_hash, parents, author, timestamp, message = token[1:].split(FIELD_SEP, 4)
+    return CommitRecord(
+        hash=_decode(commit_hash),
+        parents=_decode(parents).split(),
+        author=_decode(author),
+        timestamp=int(timestamp),
+        message=_decode(message).strip(),
+        files=[],
+    )
+
+
+def iter_tokens(stream):
+    """Yield NUL-delimited tokens from a binary stream without reading it all"""
+    pending = b""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        pieces = (pending + chunk).split(b"\0")
+        pending = pieces.pop()
+        yield from pieces
+    if pending:
+        yield pending
+
+
+def parse_log_stream(stream):
+    """
+    Incrementally parse `git log --numstat -z --format=LOG_FORMAT` output.
+
+    Renames appear as 'added<TAB>deleted<TAB>' followed by two extra tokens
+    holding the old and new path.
+    """
+    current = None
+    rename = None  # [added, deleted, old_path] while a rename is being read
+
+    for token in iter_tokens(stream):
+        if token.startswith(RECORD_SEP):
+            if current is not None:
+                yield current
+            current = _parse_header(token)
+            continue
+
+        if rename is not None:
+            if len(rename) == 2:
+                rename.append(_decode(token))
+            else:
+                added, deleted, old_path = rename
+                current.files.append(FileStat(_decode(token), old_path, added, deleted))
+                rename = None
+            continue
+
+        token = token.lstrip(b"\n")
+        if not token:
+            continue
+        added, deleted, path = token.split(b"\t", 2)
+        if path:
+            current.files.append(FileStat(_decode(path), None, _count(added), _count(deleted)))
+        else:
+            rename = [_count(added), _count(deleted)]
+
+    if current is not None:
+        yield current
+
+
+def mine_commits(repo_path, rev_range=None, reverse=True):
+    """
+    Stream CommitRecords from a local clone.
+
+    Commits come oldest first (like pydriller's traverse_commits) unless
+    reverse=False. Merge commits have no files, matching pydriller.
+    """
+    cmd = ["git", "-C", repo_path, "log", "--numstat", "-z", "-M", f"--format={LOG_FORMAT}"]
+    if reverse:
+        cmd.append("--reverse")
+    if rev_range:
+        cmd.append(rev_range)
+
+    # stderr goes to a file, not a pipe: nobody reads it until stdout is done,
+    # and a full stderr pipe would block git while we wait on stdout
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        with proc:
+            try:
+                yield from parse_log_stream(proc.stdout)
+            except GeneratorExit:
+                # Caller stopped early: don't wait for git to finish the history
+                proc.kill()
+                raise
+        stderr.seek(0)
+        err = stderr.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"git log failed: {_decode(err).strip()}")
+
+
+# ---------------- Benchmark ---------------- #
+
+def benchmark(repo_path, pydriller_limit=2000):
+    """
+    Compare the fast miner against the pydriller traversal.
+
+    pydriller is only timed on the first `pydriller_limit` commits and its
+    full-history cost is extrapolated, since on 100k+ commit histories the
+    full run takes hours.
+    """
+    from pydriller import Repository
+
+    start = time.perf_counter()
+    total = sum(1 for _ in mine_commits(repo_path))
+    fast_time = time.perf_counter() - start
+    print(f"git log miner : {total} commits in {fast_time:.2f}s "
+          f"({total / fast_time:.0f} commits/s)")
+
+    start = time.perf_counter()
+    seen = 0
+    for commit in Repository(repo_path).traverse_commits():
+        [m.new_path for m in commit.modified_files]
+        seen += 1
+        if seen >= pydriller_limit:
+            break
+    slow_time = time.perf_counter() - start
+    rate = seen / slow_time
+    print(f"pydriller     : {seen} commits in {slow_time:.2f}s ({rate:.0f} commits/s)")
+    print(f"Estimated pydriller time for full history: {total / rate:.0f}s "
+          f"(speed-up ~{(total / rate) / fast_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python git_log_miner.py <path-to-local-clone> [pydriller-commit-limit]")
+        sys.exit(1)
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    benchmark(sys.argv[1], limit)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Per-file churn / author / fix-density index built in one streaming pass.
+
+Counters live in flat NumPy arrays indexed by a file id, so the whole index
+stays compact and is saved as a single .npz. The index remembers the last
+commit it has seen; an update only streams `last..HEAD` from git.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from bug_fixing import is_bug_fix
+from git_log_miner import mine_commits
+
+repo_path = "./Ciphey"  # change this to your local path where repo is cloned
+index_file = "hotspot_index.npz"
+
+COUNTERS = ["commits", "fixes", "added", "deleted"]
+METRICS = ["fixes", "churn", "commits", "authors", "fix_density"]
+
+
+class HotspotIndex:
+    def __init__(self):
+        self.paths = []
+        self.path_ids = {}
+        self.authors = {}
+        self.author_pairs = set()  # file_id << 32 | author_id
+        self.last_commit = ""
+        self.size = 0
+        self.counts = {name: np.zeros(1024, dtype=np.int64) for name in COUNTERS}
+        self.author_counts = np.zeros(1024, dtype=np.int32)
+
+    # ---------------- Building ---------------- #
+
+    def _grow(self):
+        capacity = len(self.author_counts) * 2
+        for name, arr in self.counts.items():
+            self.counts[name] = np.resize(arr, capacity)
+            self.counts[name][self.size:] = 0
+        self.author_counts = np.resize(self.author_counts, capacity)
+        self.author_counts[self.size:] = 0
+
+    def _file_id(self, path, old_path=None):
+        if old_path is not None and old_path in self.path_ids and path not in self.path_ids:
+            # Follow renames so history stays with the file
+            fid = self.path_ids.pop(old_path)
+            self.path_ids[path] = fid
+            self.paths[fid] = path
+            return fid
+        fid = self.path_ids.get(path)
+        if fid is None:
+            if self.size == len(self.author_counts):
+                self._grow()
+            fid = self.size
+            self.size += 1
+            self.path_ids[path] = fid
+            self.paths.append(path)
+        return fid
+
+    def add_commit(self, commit):
+        author_id = self.authors.setdefault(commit.author, len(self.authors))
+        fix = is_bug_fix(commit.message)
+
+        for stat in commit.files:
+            fid = self._file_id(stat.path, stat.old_path)
+            self.counts["commits"][fid] += 1
+            self.counts["fixes"][fid] += fix
+            self.counts["added"][fid] += stat.added or 0
+            self.counts["deleted"][fid] += stat.deleted or 0
+
+            pair = (fid << 32) | author_id
+            if pair not in self.author_pairs:
+                self.author_pairs.add(pair)
+                self.author_counts[fid] += 1
+
+        self.last_commit = commit.hash
+
+    def update(self, repo):
+        """Stream only the commits added since the last update"""
+        rev_range = f"{self.last_commit}..HEAD" if self.last_commit else None
+        seen = 0
+        for commit in mine_commits(repo, rev_range=rev_range):
+            self.add_commit(commit)
+            seen += 1
+        return seen
+
+    # ---------------- Queries ---------------- #
+
+    def metric(self, name):
+        n = self.size
+        if name == "churn":
+            return self.counts["added"][:n] + self.counts["deleted"][:n]
+        if name == "authors":
+            return self.author_counts[:n]
+        if name == "fix_density":
+            commits = self.counts["commits"][:n]
+            return np.divide(self.counts["fixes"][:n], commits,
+                             out=np.zeros(n), where=commits > 0)
+        return self.counts[name][:n]
+
+    def top(self, n=10, by="fixes"):
+        values = self.metric(by)
+        n = min(n, len(values))
+        if n == 0:
+            return []
+        best = np.argpartition(-values, n - 1)[:n]
+        best = best[np.argsort(-values[best], kind="stable")]
+        return [(self.paths[i], values[i]) for i in best]
+
+    # ---------------- Persistence ---------------- #
+
+    def save(self, path):
+        n = self.size
+        np.savez_compressed(
+            path,
+            paths=np.array(self.paths, dtype=str),
+            authors=np.array(sorted(self.authors, key=self.authors.get), dtype=str),
+            author_pairs=np.fromiter(self.author_pairs, dtype=np.int64, count=len(self.author_pairs)),
+            author_counts=self.author_counts[:n],
+            last_commit=np.array(self.last_commit),
+            **{name: arr[:n] for name, arr in self.counts.items()},
+        )
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            index.paths = data["paths"].tolist()
+            index.size = len(index.paths)
+            index.path_ids = {p: i for i, p in enumerate(index.paths)}
+            index.authors = {a: i for i, a in enumerate(data["authors"].tolist())}
+            index.author_pairs = set(data["author_pairs"].tolist())
+            index.last_commit = str(data["last_commit"])
+            capacity = max(1024, index.size * 2)
+            index.author_counts = np.zeros(capacity, dtype=np.int32)
+            index.author_counts[:index.size] = data["author_counts"]
+            for name in COUNTERS:
+                index.counts[name] = np.zeros(capacity, dtype=np.int64)
+                index.counts[name][:index.size] = data[name]
+        return index
+
+
+def main():
+    # Usage: python hotspots.py update [path-to-local-clone]
+    #        python hotspots.py top [N] [fixes|churn|commits|authors|fix_density]
+    command = sys.argv[1] if len(sys.argv) > 1 else "top"
+    index = HotspotIndex.load(index_file)
+
+    if command == "update":
+        repo = sys.argv[2] if len(sys.argv) > 2 else repo_path
+        added = index.update(repo)
+        index.save(index_file)
+        print(f"✓ Indexed {added} new commits ({index.size} files tracked) -> {index_file}")
+    elif command == "top":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        by = sys.argv[3] if len(sys.argv) > 3 else "fixes"
+        if by not in METRICS:
+            print(f"Unknown metric '{by}', choose one of {METRICS}")
+            sys.exit(1)
+        print(f"Top {n} hotspots by {by}:")
+        for path, value in index.top(n, by):
+            print(f"  {value:>10.3f}  {path}" if by == "fix_density" else f"  {value:>10}  {path}")
+    else:
+        print(f"Unknown command '{command}'")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+MinHash / LSH near-duplicate index over the stored file versions (codes/).
+
+Every version is reduced to the set of its 5-token shingles and then to a
+128-value MinHash signature; the fraction of equal signature values
+estimates the Jaccard similarity of two shingle sets. Signatures are cut
+into 32 bands of 4 values and each band is hashed into a bucket, so files
+sharing any band become candidates - a lookup touches a handful of buckets
+instead of every stored version.
+
+Usage: python near_duplicates.py build              - index new files in codes/, write cluster report
+       python near_duplicates.py query <file> [N]   - near-duplicates of one file
+"""
+
+import csv
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+codes_dir = "codes"
+index_file = "minhash_index.npz"
+report_csv = "near_duplicate_clusters.csv"
+
+SHINGLE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8  # estimated Jaccard to call two versions near-duplicates
+
+# Fixed seed: signatures stay comparable across runs and processes
+_rng = np.random.default_rng(20240921)
+_MUL = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_ADD = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+
+def shingle_hashes(text):
+    """Distinct 64-bit hashes of the text's SHINGLE-token windows"""
+    tokens = text.split()
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    ids = np.fromiter((zlib.crc32(t.encode("utf-8", errors="replace")) for t in tokens),
+                      dtype=np.uint64, count=len(tokens))
+    width = max(1, len(ids) - SHINGLE + 1)
+    hashes = np.zeros(width, dtype=np.uint64)
+    for j in range(min(SHINGLE, len(ids))):
+        hashes = hashes * np.uint64(1000003) + ids[j:j + width]  # wraps mod 2**64
+    return np.unique(hashes)
+
+
+def signature(shingles, chunk=4096):
+    """MinHash via multiply-shift hashing: h_i(x) = high 32 bits of (a_i x + b_i) mod 2**64"""
+    sig = _EMPTY.copy()
+    for start in range(0, len(shingles), chunk):
+        block = shingles[start:start + chunk, None] * _MUL + _ADD
+        sig = np.minimum(sig, (block >> np.uint64(32)).astype(np.uint32).min(axis=0))
+    return sig
+
+
+def file_signature(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return signature(shingle_hashes(f.read()))
+
+
+def estimate_jaccard(a, b):
+    return float(np.mean(a == b))
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+class MinHashIndex:
+    def __init__(self, paths=None, signatures=None):
+        self.paths = list(paths or [])
+        self.signatures = signatures if signatures is not None else np.zeros((0, NUM_PERM), np.uint32)
+        self.buckets = {}
+        self._bucket_rows(range(len(self.paths)))
+
+    def _band_keys(self, sig):
+        return [(b, sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+    def _bucket_rows(self, rows):
+        for i in rows:
+            if np.array_equal(self.signatures[i], _EMPTY):
+                continue  # empty version (added / deleted file): duplicates nothing
+            for key in self._band_keys(self.signatures[i]):
+                self.buckets.setdefault(key, []).append(i)
+
+    # ---------------- Building ---------------- #
+
+    def add_files(self, paths, workers=None):
+        """Sign files not indexed yet, in parallel; returns how many were added"""
+        known = set(self.paths)
+        new = [p for p in paths if p not in known]
+        if not new:
+            return 0
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            sigs = [file_signature(p) for p in new]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                sigs = list(pool.map(file_signature, new, chunksize=64))
+        first = len(self.paths)
+        self.paths.extend(new)
+        self.signatures = np.vstack([self.signatures, np.array(sigs, dtype=np.uint32)])
+        self._bucket_rows(range(first, len(self.paths)))
+        return len(new)
+
+    # ---------------- Queries ---------------- #
+
+    def query(self, sig, threshold=THRESHOLD):
+        """[(row, estimated Jaccard)] for indexed versions sharing a band, best first"""
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+        hits = [(i, estimate_jaccard(sig, self.signatures[i])) for i in candidates]
+        return sorted((h for h in hits if h[1] >= threshold), key=lambda h: -h[1])
+
+    def clusters(self, threshold=THRESHOLD):
+        """Connected components of the candidate pairs that pass the threshold"""
+        uf = UnionFind(len(self.paths))
+        for rows in self.buckets.values():
+            if len(rows) < 2:
+                continue
+            # Identical signatures are merged directly; only distinct ones are compared
+            distinct = {}
+            for i in rows:
+                key = self.signatures[i].tobytes()
+                if key in distinct:
+                    uf.union(distinct[key], i)
+                else:
+                    distinct[key] = i
+            reps = list(distinct.values())
+            for x in range(len(reps)):
+                for y in range(x + 1, len(reps)):
+                    if estimate_jaccard(self.signatures[reps[x]], self.signatures[reps[y]]) >= threshold:
+                        uf.union(reps[x], reps[y])
+
+        groups = {}
+        for i in range(len(self.paths)):
+            groups.setdefault(uf.find(i), []).append(i)
+        return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+    # ---------------- Persistence ---------------- #
+
+    def save(self, path):
+        np.savez_compressed(path, paths=np.array(self.paths, dtype=str), signatures=self.signatures)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(data["paths"].tolist(), data["signatures"])
+
+
+def write_report(index, clusters, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Cluster ID", "Cluster Size", "Representative", "Files"])
+        for cid, rows in enumerate(clusters, 1):
+            names = [os.path.basename(index.paths[i]) for i in rows]
+            writer.writerow([cid, len(rows), names[0], ";".join(names)])
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    index = MinHashIndex.load(index_file)
+
+    if command == "build":
+        paths = sorted(os.path.join(codes_dir, name) for name in os.listdir(codes_dir))
+        added = index.add_files(paths)
+        index.save(index_file)
+        print(f"✓ Signed {added} new versions ({len(index.paths)} indexed) -> {index_file}")
+
+        clusters = index.clusters()
+        write_report(index, clusters, report_csv)
+        in_clusters = sum(len(c) for c in clusters)
+        print(f"✓ {len(clusters)} near-duplicate clusters covering {in_clusters} versions -> {report_csv}")
+    elif command == "query":
+        if len(sys.argv) < 3:
+            print("Usage: python near_duplicates.py query <file> [N]")
+            sys.exit(1)
+        n = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+        hits = index.query(file_signature(sys.argv[2]))[:n]
+        print(f"Near-duplicates of {sys.argv[2]} (estimated Jaccard >= {THRESHOLD}):")
+        for row, score in hits:
+            print(f"  {score:.3f}  {index.paths[row]}")
+    else:
+        print(f"Unknown command '{command}'")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
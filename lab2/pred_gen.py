@@ -3,16 +3,20 @@ import os
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
-# Load tokenizer and model
 MODEL_NAME = "mamiksik/CommitPredictorT5"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
 
 def classify_fix_type(diff_content: str) -> str:
     """
     Use the pre-trained model to predict the type of fix
     from a given diff text.
     """
+    # Load tokenizer and model on first use
+    if not hasattr(classify_fix_type, "tokenizer"):
+        classify_fix_type.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        classify_fix_type.model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+    tokenizer = classify_fix_type.tokenizer
+    model = classify_fix_type.model
+
     prompt = f"commit: {diff_content}"
     encoded = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
     with torch.no_grad():
@@ -24,27 +28,36 @@ input_csv = "commit_diffs.csv"
 output_csv = "commit_predictions.csv"
 diff_column = "Diff File Path"
 
-# Process CSV rows
-with open(input_csv, "r", encoding="utf-8") as infile, \
-     open(output_csv, "w", encoding="utf-8", newline="") as outfile:
+def predict_row(row):
+    """Fix-type prediction for one commit_diffs.csv row ("" if there is no diff)"""
+    diff_file_path = row.get(diff_column, "")
+    prediction = ""
+
+    if diff_file_path and os.path.exists(diff_file_path):
+        with open(diff_file_path, "r", encoding="utf-8") as diff_file:
+            diff_data = diff_file.read().strip()
+            if diff_data:
+                prediction = classify_fix_type(diff_data)
+    return prediction
+
+
+def main():
+    # Process CSV rows
+    with open(input_csv, "r", encoding="utf-8") as infile, \
+         open(output_csv, "w", encoding="utf-8", newline="") as outfile:
 
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames + ["LLM Inference (fix type)"]
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
+        reader = csv.DictReader(infile)
+        fieldnames = reader.fieldnames + ["LLM Inference (fix type)"]
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
 
-    writer.writeheader()
+        writer.writeheader()
 
-    for row in reader:
-        diff_file_path = row.get(diff_column, "")
-        prediction = ""
+        for row in reader:
+            row["LLM Inference (fix type)"] = predict_row(row)
+            writer.writerow(row)
 
-        if diff_file_path and os.path.exists(diff_file_path):
-            with open(diff_file_path, "r", encoding="utf-8") as diff_file:
-                diff_data = diff_file.read().strip()
-                if diff_data:
-                    prediction = classify_fix_type(diff_data)
+    print(f"Predictions saved to {output_csv}")
 
-        row["LLM Inference (fix type)"] = prediction
-        writer.writerow(row)
 
-print(f"Predictions saved to {output_csv}")
+if __name__ == "__main__":
+    main()
@@ -53,21 +53,29 @@ def rectifier(commit_msg, fix_type, diff_path, file_name, before_path, after_pat
 	rectified = tokenizer.decode(outputs[0], skip_special_tokens=True)
 	return rectified
 
-csv_p = "commit_predictions.csv"
-df = pd.read_csv(csv_p)
-
-# Add the Rectified Message column
-df["Rectified Message"] = df.apply(
-	lambda row: rectifier(
+def rectify_row(row):
+	return rectifier(
 		row["Commit Message"],
 		row["LLM Inference (fix type)"],
 		row["Diff File Path"],
 		row["File Name"],
 		row["Source Code Before File Path"],
 		row["Source Code After File Path"]
-	),
-	axis=1
-)
+	)
+
+
+csv_p = "commit_predictions.csv"
+
+
+def main():
+	df = pd.read_csv(csv_p)
+
+	# Add the Rectified Message column
+	df["Rectified Message"] = df.apply(rectify_row, axis=1)
+
+	df.to_csv(csv_p, index=False)
+	print("Rectified Message column added to commit_predictions.csv")
+
 
-df.to_csv(csv_p, index=False)
-print("Rectified Message column added to commit_predictions.csv")
\ No newline at end of file
+if __name__ == "__main__":
+	main()
@@ -4,11 +4,140 @@ Lab 2 Analysis Script (Ciphey Repository)
 Performs lightweight commit analysis and generates a markdown report
 """
 
-import pandas as pd
 import numpy as np
 from collections import Counter
 from datetime import datetime
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import load  # noqa: E402
+
+KEYWORDS = ["fix", "bug", "error", "crash", "issue", "problem", "broken"]
+PRECISE_IND = ["fix", "bug", "error", "issue", "crash"]
+VAGUE_IND = ["update", "change", "modify", "refactor"]
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _valid_text(value):
+    return not _missing(value) and str(value).strip() not in ('', 'nan')
+
+
+# Every statistic below is a sum of per-row counters, so the dataflow mode can
+# add/subtract single rows instead of re-reading both CSVs.
+
+def commit_contribution(message, is_merge, modified_files):
+    """Counters contributed by one row of bug_fixing_commits.csv"""
+    counts = Counter(commits=1, merge=int(str(is_merge) == "True"), files=0)
+    try:
+        parsed = eval(modified_files) if not _missing(modified_files) else []
+        counts["files"] = len(parsed)
+    except:
+        pass
+
+    lower = "" if _missing(message) else str(message).lower()
+    for k in KEYWORDS:
+        if k in lower:
+            counts["kw:" + k] += 1
+    return counts
+
+
+def row_contribution(commit_message, fix_type, rectified, file_name):
+    """Counters contributed by one row of commit_predictions.csv"""
+    counts = Counter(rows=1)
+
+    # RQ1: developer message precision
+    if _missing(commit_message):
+        counts["neutral"] += 1
+    else:
+        lower = str(commit_message).lower()
+        if any(word in lower for word in PRECISE_IND):
+            counts["precise"] += 1
+        elif any(word in lower for word in VAGUE_IND):
+            counts["vague"] += 1
+        else:
+            counts["neutral"] += 1
+
+    # RQ2: LLM prediction present
+    if _valid_text(fix_type):
+        counts["valid_pred"] += 1
+
+    # RQ3: rectification present / improved
+    if _valid_text(rectified):
+        counts["valid_rect"] += 1
+        if len(str(rectified).strip()) > len(str(commit_message).strip()) * 0.8:
+            counts["improved"] += 1
+
+    # File type
+    if not _missing(file_name) and '.' in str(file_name):
+        counts["ext:" + str(file_name).split('.')[-1].lower()] += 1
+    else:
+        counts["ext:no_extension"] += 1
+    return counts
+
+
+def summarize(counts):
+    """Turn aggregated counters into the results dict used by the report"""
+    total_commits = counts["commits"]
+    rows = counts["rows"]
+    kw_freq = {k: counts["kw:" + k] for k in KEYWORDS}
+    ext_counts = Counter({key[4:]: v for key, v in counts.items() if key.startswith("ext:") and v > 0})
+
+    return {
+        'total_bug_commits': total_commits,
+        'merge_commits': counts["merge"],
+        'avg_files_per_commit': counts["files"] / total_commits if total_commits else 0.0,
+        'keyword_frequency': kw_freq,
+        'precise': counts["precise"],
+        'vague': counts["vague"],
+        'neutral': counts["neutral"],
+        'rows': rows,
+        'valid_predictions': counts["valid_pred"],
+        'valid_rectifications': counts["valid_rect"],
+        'improvements': counts["improved"],
+        'developer_precision_rate': counts["precise"] / rows * 100 if rows else 0.0,
+        'llm_success_rate': counts["valid_pred"] / rows * 100 if rows else 0.0,
+        'rectification_rate': counts["improved"] / rows * 100 if rows else 0.0,
+        'top_keywords': dict(sorted(kw_freq.items(), key=lambda x: x[1], reverse=True)[:5]),
+        'top_file_types': dict(ext_counts.most_common(5)),
+        'file_type_counts': ext_counts,
+    }
+
+
+def print_results(results):
+    total_commits = results['total_bug_commits']
+    merge_count = results['merge_commits']
+    print(f"\nTotal bug-fix commits: {total_commits}")
+    print(f"Merge commits: {merge_count}")
+    print(f"Non-merge commits: {total_commits - merge_count}")
+
+    print("\nMost frequent bug-related terms:")
+    for k, v in results['top_keywords'].items():
+        print(f"  {k}: {v}")
+
+    print(f"\nAverage number of files per commit: {results['avg_files_per_commit']:.2f}")
+
+    rows = results['rows']
+    print("\nRQ1 Developer Precision:")
+    print(f"Precise: {results['precise']} ({results['developer_precision_rate']:.1f}%)")
+    print(f"Vague: {results['vague']} ({results['vague']/rows*100:.1f}%)")
+    print(f"Neutral: {results['neutral']} ({results['neutral']/rows*100:.1f}%)")
+
+    print("\nRQ2 LLM Predictions:")
+    print(f"Valid predictions: {results['valid_predictions']} ({results['llm_success_rate']:.1f}%)")
+
+    print("\nRQ3 Rectifier Results:")
+    print(f"Valid rectifications: {results['valid_rectifications']} "
+          f"({results['valid_rectifications']/rows*100:.1f}%)")
+    print(f"Improvements: {results['improvements']} ({results['rectification_rate']:.1f}%)")
+
+    print("\nTop modified file types:")
+    for ext, count in results['file_type_counts'].most_common(5):
+        print(f"  .{ext}: {count}")
+
 
 def run_analysis():
     """Load CSV data and perform commit analysis"""
@@ -16,7 +145,7 @@ def run_analysis():
 
     # Load bug-fixing commits
     try:
-        bug_data = pd.read_csv('bug_fixing_commits.csv')
+        bug_data = load("bug_fixing_commits")
         print(f"✓ {len(bug_data)} bug-fixing commits loaded")
     except Exception as e:
         print(f"✗ Could not read bug_fixing_commits.csv: {e}")
@@ -24,7 +153,7 @@ def run_analysis():
 
     # Load prediction data
     try:
-        pred_data = pd.read_csv('commit_predictions.csv')
+        pred_data = load("commit_predictions")
         print(f"✓ {len(pred_data)} commit predictions loaded")
     except Exception as e:
         print(f"✗ Could not read commit_predictions.csv: {e}")
@@ -52,107 +181,16 @@ def run_analysis():
     print("4. ✓ Clear bug-fix history for analysis")
     print("5. ✓ Popularity and real-world relevance")
 
-    # Bug-fix stats
-    total_commits = len(bug_data)
-    merge_count = bug_data['Is a merge commit?'].sum()
-    non_merge_count = total_commits - merge_count
-
-    print(f"\nTotal bug-fix commits: {total_commits}")
-    print(f"Merge commits: {merge_count}")
-    print(f"Non-merge commits: {non_merge_count}")
-
-    # Keyword frequency
-    keywords = ["fix", "bug", "error", "crash", "issue", "problem", "broken"]
-    kw_freq = {k: bug_data['Message'].str.lower().str.contains(k, na=False).sum() for k in keywords}
-
-    print("\nMost frequent bug-related terms:")
-    for k, v in sorted(kw_freq.items(), key=lambda x: x[1], reverse=True)[:5]:
-        print(f"  {k}: {v}")
-
-    # Files modified per commit
-    file_counts = []
-    for row in bug_data['List of modified files']:
-        try:
-            parsed = eval(row) if pd.notna(row) else []
-            file_counts.append(len(parsed))
-        except:
-            file_counts.append(0)
-
-    avg_files = np.mean(file_counts)
-    print(f"\nAverage number of files per commit: {avg_files:.2f}")
-
-    # RQ1: Developer message precision
-    dev_msgs = pred_data['Commit Message'].tolist()
-    precise_ind = ["fix", "bug", "error", "issue", "crash"]
-    vague_ind = ["update", "change", "modify", "refactor"]
-
-    precise, vague, neutral = 0, 0, 0
-    for msg in dev_msgs:
-        if pd.isna(msg):
-            neutral += 1
-            continue
-        lower = msg.lower()
-        if any(word in lower for word in precise_ind):
-            precise += 1
-        elif any(word in lower for word in vague_ind):
-            vague += 1
-        else:
-            neutral += 1
-
-    dev_precision = precise / len(dev_msgs) * 100
-
-    print("\nRQ1 Developer Precision:")
-    print(f"Precise: {precise} ({dev_precision:.1f}%)")
-    print(f"Vague: {vague} ({vague/len(dev_msgs)*100:.1f}%)")
-    print(f"Neutral: {neutral} ({neutral/len(dev_msgs)*100:.1f}%)")
-
-    # RQ2: LLM success rate
-    llm_preds = pred_data['LLM Inference (fix type)'].tolist()
-    good_preds = sum(1 for p in llm_preds if pd.notna(p) and str(p).strip() not in ('', 'nan'))
-    llm_rate = good_preds / len(llm_preds) * 100
-
-    print("\nRQ2 LLM Predictions:")
-    print(f"Valid predictions: {good_preds} ({llm_rate:.1f}%)")
-
-    # RQ3: Rectification success
-    rectified = pred_data['Rectified Message'].tolist()
-    improved, valid = 0, 0
-    for orig, rect in zip(dev_msgs, rectified):
-        if pd.notna(rect) and str(rect).strip() not in ('', 'nan'):
-            valid += 1
-            if len(str(rect).strip()) > len(str(orig).strip()) * 0.8:
-                improved += 1
-
-    rect_rate = improved / len(rectified) * 100
-
-    print("\nRQ3 Rectifier Results:")
-    print(f"Valid rectifications: {valid} ({valid/len(rectified)*100:.1f}%)")
-    print(f"Improvements: {improved} ({rect_rate:.1f}%)")
-
-    # File type distribution
-    file_exts = []
-    for f in pred_data['File Name']:
-        if pd.notna(f) and '.' in str(f):
-            file_exts.append(str(f).split('.')[-1].lower())
-        else:
-            file_exts.append('no_extension')
-    
-    ext_counts = Counter(file_exts)
-    print("\nTop modified file types:")
-    for ext, count in ext_counts.most_common(5):
-        print(f"  .{ext}: {count}")
-
-    results = {
-        'total_bug_commits': total_commits,
-        'merge_commits': merge_count,
-        'avg_files_per_commit': avg_files,
-        'developer_precision_rate': dev_precision,
-        'llm_success_rate': llm_rate,
-        'rectification_rate': rect_rate,
-        'top_keywords': dict(sorted(kw_freq.items(), key=lambda x: x[1], reverse=True)[:5]),
-        'top_file_types': dict(ext_counts.most_common(5))
-    }
+    counts = Counter()
+    for msg, is_merge, files in zip(bug_data['Message'], bug_data['Is a merge commit?'],
+                                    bug_data['List of modified files']):
+        counts.update(commit_contribution(msg, is_merge, files))
+    for msg, pred, rect, fname in zip(pred_data['Commit Message'], pred_data['LLM Inference (fix type)'],
+                                      pred_data['Rectified Message'], pred_data['File Name']):
+        counts.update(row_contribution(msg, pred, rect, fname))
 
+    results = summarize(counts)
+    print_results(results)
     return results, ciphey_stats
 
 def make_report(results, repo_stats):
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+SZZ stage: find the commits that introduced the bugs fixed in bug_fixing_commits.csv.
+
+For every (non-merge) fix commit the lines it deletes or modifies are blamed
+in the parent revision; the commits that last touched those lines are the
+bug-inducing candidates. Blame output is cached per (repository, file,
+revision) - in memory and on disk - so fixes that share a parent and a file
+blame it once, and all git work runs in a process pool.
+"""
+
+import ast
+import csv
+import os
+import pickle
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+repo_path = "./Ciphey"  # change this to your local path where repo is cloned
+input_csv = "bug_fixing_commits.csv"
+output_csv = "bug_inducing_commits.csv"
+cache_file = "szz_blame_cache.pkl"
+
+# bug_fixing.py writes the short header, the committed CSV uses the long one
+COLUMN_ALIASES = {
+    "hash": ["hash", "Hash"],
+    "parents": ["parents", "Hashes of parents"],
+    "is_merge": ["is_merge", "Is a merge commit?"],
+}
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+
+
+def _get(row, field):
+    for name in COLUMN_ALIASES[field]:
+        if name in row:
+            return row[name]
+    raise KeyError(field)
+
+
+def load_fix_commits(path):
+    """Return (fix_hash, parent_hash) for every non-merge fix commit"""
+    fixes = []
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if str(_get(row, "is_merge")).strip() == "True":
+                continue
+            parents = ast.literal_eval(_get(row, "parents") or "[]")
+            if len(parents) != 1:
+                continue  # root commit: nothing to blame
+            fixes.append((_get(row, "hash"), parents[0]))
+    return fixes
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", repo, "-c", "core.quotepath=off", *args], capture_output=True,
+                          text=True, encoding="utf-8", errors="replace").stdout
+
+
+# ---------------- Pool workers ---------------- #
+
+def changed_lines(repo, job):
+    """
+    Lines of the parent revision that the fix deletes or modifies,
+    grouped by parent-side path. Blank removed lines are ignored.
+    """
+    fix_hash, parent = job
+    diff = _git(repo, "diff", "-U0", "--no-color", "--no-ext-diff", "-M", parent, fix_hash)
+
+    result = {}
+    old_path = None
+    old_line = 0
+    old_left = new_left = 0  # body lines of the current hunk still to come
+    for line in diff.splitlines():
+        if old_left > 0 or new_left > 0:
+            # Hunk body: a removed "-- a/x" line is content, not a file header
+            if line.startswith("-"):
+                if old_path is not None and line[1:].strip():
+                    result.setdefault(old_path, []).append(old_line)
+                old_line += 1
+                old_left -= 1
+            elif line.startswith("+"):
+                new_left -= 1
+            elif line.startswith(" "):
+                old_line += 1
+                old_left -= 1
+                new_left -= 1
+            continue  # "\ No newline at end of file"
+        if line.startswith("diff --git"):
+            old_path = None
+        elif line.startswith("--- "):
+            old_path = line[6:] if line.startswith("--- a/") else None
+        elif line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            if match:
+                old_line = int(match.group(1))
+                old_left = int(match.group(2)) if match.group(2) is not None else 1
+                new_left = int(match.group(3)) if match.group(3) is not None else 1
+    return fix_hash, parent, result
+
+
+def blame_file(repo, job):
+    """Blame a whole file once; returns the origin commit of every line (1-based)"""
+    path, rev = job
+    porcelain = _git(repo, "blame", "--porcelain", "-w", rev, "--", path)
+
+    origins = [None]  # index 0 unused so line numbers index directly
+    for line in porcelain.splitlines():
+        parts = line.split(" ")
+        # Header lines: "<40-hex sha> <orig line> <final line> [<group size>]"
+        if len(parts) >= 3 and len(parts[0]) == 40 and not line.startswith("\t"):
+            final_line = int(parts[2])
+            if final_line >= len(origins):
+                origins.extend([None] * (final_line - len(origins) + 1))
+            origins[final_line] = parts[0]
+    return job, origins
+
+
+# ---------------- Blame cache ---------------- #
+
+def load_cache():
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    return {}
+
+
+def save_cache(cache):
+    with open(cache_file, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run_szz(repo, fixes, workers=None):
+    cache = load_cache()
+    repo_key = os.path.realpath(repo)  # the same revision and path in two clones are different files
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        print(f">> Collecting changed lines for {len(fixes)} fix commits...")
+        changes = list(pool.map(partial(changed_lines, repo), fixes, chunksize=16))
+
+        jobs = {(path, parent) for _, parent, files in changes for path in files}
+        missing = [job for job in jobs if (repo_key, *job) not in cache]
+        print(f">> Blaming {len(missing)} (file, revision) pairs "
+              f"({len(jobs) - len(missing)} served from cache)...")
+        for job, origins in pool.map(partial(blame_file, repo), missing, chunksize=8):
+            cache[(repo_key, *job)] = origins
+
+    save_cache(cache)
+
+    rows = []
+    for fix_hash, parent, files in changes:
+        for path, lines in files.items():
+            origins = cache[(repo_key, path, parent)]
+            blamed = {}
+            for n in lines:
+                origin = origins[n] if n < len(origins) else None
+                if origin and origin != fix_hash:
+                    blamed.setdefault(origin, []).append(n)
+            for origin, blamed_lines in blamed.items():
+                rows.append([fix_hash, path, parent, origin, len(blamed_lines),
+                             " ".join(map(str, blamed_lines))])
+    return rows
+
+
+def main():
+    # Usage: python szz.py [path-to-local-clone]
+    repo = sys.argv[1] if len(sys.argv) > 1 else repo_path
+
+    fixes = load_fix_commits(input_csv)
+    rows = run_szz(repo, fixes)
+
+    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Fix Hash", "File", "Parent Hash", "Bug-Inducing Hash",
+                         "Blamed Line Count", "Blamed Lines"])
+        writer.writerows(rows)
+
+    inducing = {row[3] for row in rows}
+    print(f"✓ {len(rows)} (fix, file, candidate) rows, {len(inducing)} distinct "
+          f"bug-inducing commits saved to {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Approximate nearest-neighbour search over CodeBERT embeddings (IVF-PQ, NumPy only).
+
+Vectors are L2-normalised so cosine similarity is an inner product.
+
+- IVF: a k-means coarse quantiser splits the vectors into n_lists inverted
+  lists; a query only scans the nprobe lists whose centroids are closest.
+- PQ: each vector's residual (vector - its list centroid) is cut into M
+  sub-vectors and every sub-vector is replaced by the id of its nearest of
+  256 sub-centroids, so a 768-dim float32 vector (3 KB) is stored as M
+  uint8 codes. q . x ~= q . centroid + sum_m q_m . codebook_m[code_m], and
+  the second term is a (M, 256) lookup table computed once per query.
+- Optional refinement: the best k * 10 PQ candidates are re-scored exactly
+  against the full vectors, which stay on disk in the EmbeddingStore
+  memmap, so only those few rows are read.
+
+Only whole-file embeddings of the dataset's before / after versions are
+indexed (not the chunk embeddings the cache also holds). Index ids are
+EmbeddingStore rows; ann_index_entries.csv maps every row back to its SHA
+and to the commit / file / version it is the text of.
+
+Usage: python ann_index.py build                     - index the file embeddings in the cache
+       python ann_index.py eval [k]                  - recall@k against exact search on the cache
+       python ann_index.py similar COMMIT [FILE] [k] - the fixes closest to one fix
+       python ann_index.py bench [N]                 - recall / speed on N synthetic vectors
+       python ann_index.py check                     - self-checks on small synthetic data
+"""
+
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from content_store import ContentStore, attach_text
+from embedding_store import EmbeddingStore, text_sha
+
+embedding_cache = "embedding_cache"
+source_file = "commit_metrics.csv"
+index_file = "ann_index.npz"
+entries_file = "ann_index_entries.csv"
+
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def _kmeans(x, k, iters=20, seed=0, chunk=65536):
+    """Lloyd's k-means (squared L2); empty clusters are re-seeded from random points"""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=len(x) < k)].copy()
+    assign = np.zeros(len(x), dtype=np.int64)
+    for _ in range(iters):
+        assign = _nearest(x, centroids, chunk)
+        order = np.argsort(assign, kind="stable")
+        present, starts = np.unique(assign[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[present] = np.add.reduceat(x[order], starts)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+    return centroids, assign
+
+
+def _nearest(x, centroids, chunk=65536):
+    c_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(c_norms[None, :] - 2 * block @ centroids.T, axis=1)
+    return out
+
+
+class IVFPQIndex:
+    def __init__(self, n_lists=256, n_subvectors=48, nprobe=8, seed=0):
+        self.n_lists = n_lists
+        self.n_subvectors = n_subvectors
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids = None   # (n_lists, dim)
+        self.codebooks = None   # (M, 256, dim / M)
+        self.codes = np.zeros((0, n_subvectors), dtype=np.uint8)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.list_ptr = np.zeros(n_lists + 1, dtype=np.int64)  # CSR offsets into codes / ids
+
+    # ---------------- Training / adding ---------------- #
+
+    def train(self, vectors, max_train=100_000):
+        x = _normalize(vectors)
+        if not len(x):
+            raise ValueError("Cannot train an index on 0 vectors")
+        if len(x) > max_train:
+            x = x[np.random.default_rng(self.seed).choice(len(x), max_train, replace=False)]
+        dim = x.shape[1]
+        if dim % self.n_subvectors:
+            raise ValueError(f"dimension {dim} is not divisible by {self.n_subvectors} sub-vectors")
+        self.n_lists = min(self.n_lists, len(x))
+        self.centroids, assign = _kmeans(x, self.n_lists, seed=self.seed)
+        # New lists: nothing is indexed in them yet
+        self.codes = np.zeros((0, self.n_subvectors), dtype=np.uint8)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.list_ptr = np.zeros(self.n_lists + 1, dtype=np.int64)
+
+        residuals = x - self.centroids[assign]
+        sub = dim // self.n_subvectors
+        self.codebooks = np.stack([
+            _kmeans(residuals[:, m * sub:(m + 1) * sub], 256, iters=15, seed=self.seed + m)[0]
+            for m in range(self.n_subvectors)
+        ])
+        return self
+
+    def _encode(self, residuals):
+        sub = residuals.shape[1] // self.n_subvectors
+        return np.stack([_nearest(residuals[:, m * sub:(m + 1) * sub], self.codebooks[m])
+                         for m in range(self.n_subvectors)], axis=1).astype(np.uint8)
+
+    def add(self, vectors, ids=None):
+        x = _normalize(vectors)
+        ids = np.arange(len(self.ids), len(self.ids) + len(x)) if ids is None else np.asarray(ids)
+        lists = _nearest(x, self.centroids)
+        codes = self._encode(x - self.centroids[lists])
+
+        # Merge with what is indexed already and regroup by list
+        old_lists = np.repeat(np.arange(self.n_lists), np.diff(self.list_ptr))
+        all_lists = np.concatenate([old_lists, lists])
+        order = np.argsort(all_lists, kind="stable")
+        self.codes = np.concatenate([self.codes, codes])[order]
+        self.ids = np.concatenate([self.ids, ids])[order]
+        self.list_ptr = np.concatenate([[0], np.cumsum(np.bincount(all_lists, minlength=self.n_lists))])
+        return self
+
+    # ---------------- Search ---------------- #
+
+    def search(self, query, k=10, nprobe=None, refine=None):
+        """
+        (ids, cosine scores) of the k best matches, best first. Scores are PQ
+        approximations unless refine (full vectors indexable by id) is given.
+        """
+        q = _normalize(query).reshape(-1)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        coarse = self.centroids @ q
+        probe = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+
+        sub = len(q) // self.n_subvectors
+        lut = np.einsum("msd,md->ms", self.codebooks, q.reshape(self.n_subvectors, sub))
+
+        rows = np.concatenate([np.arange(self.list_ptr[l], self.list_ptr[l + 1]) for l in probe])
+        if not len(rows):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        base = np.repeat(coarse[probe], self.list_ptr[probe + 1] - self.list_ptr[probe])
+        scores = base + lut[np.arange(self.n_subvectors), self.codes[rows]].sum(axis=1)
+
+        keep = min(k * 10 if refine is not None else k, len(rows))
+        best = np.argpartition(-scores, keep - 1)[:keep]
+        ids, scores = self.ids[rows[best]], scores[best]
+        if refine is not None:
+            order = np.argsort(ids)  # sorted reads from the memmap
+            ids = ids[order]
+            scores = _normalize(refine[ids]) @ q
+        top = np.argsort(-scores, kind="stable")[:k]
+        return ids[top], scores[top]
+
+    # ---------------- Persistence ---------------- #
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, codebooks=self.codebooks, codes=self.codes,
+                 ids=self.ids, list_ptr=self.list_ptr,
+                 params=np.array([self.n_lists, self.n_subvectors, self.nprobe, self.seed]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_lists, n_subvectors, nprobe, seed = data["params"].tolist()
+            index = cls(n_lists, n_subvectors, nprobe, seed)
+            for name in ("centroids", "codebooks", "codes", "ids", "list_ptr"):
+                setattr(index, name, data[name])
+        return index
+
+
+def exact_search(unit_vectors, query, k=10):
+    """Brute-force top-k; unit_vectors must already be L2-normalised"""
+    scores = unit_vectors @ _normalize(query).reshape(-1)
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def recall_at_k(index, vectors, queries, k=10, nprobe=None, refine=None, ids=None):
+    """Mean fraction of the exact top-k that the index also returns; ids[i] is the id of vectors[i]"""
+    vectors = _normalize(vectors)
+    ids = np.arange(len(vectors)) if ids is None else ids
+    hits = 0
+    for q in queries:
+        found, _ = index.search(q, k, nprobe, refine)
+        hits += len(np.intersect1d(found, ids[exact_search(vectors, q, k)]))
+    return hits / (len(queries) * k)
+
+
+def report(index, vectors, queries, k, ids=None, full=None):
+    """full: the full vectors indexable by id, for refinement (default: vectors)"""
+    vectors = _normalize(vectors)
+    full = vectors if full is None else full
+    print(f"Index: {len(index.ids)} vectors, {index.n_lists} lists, "
+          f"{index.codes.shape[1]} bytes/vector (float32: {vectors.shape[1] * 4})")
+    start = time.perf_counter()
+    for q in queries:
+        exact_search(vectors, q, k)
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"Exact search: {exact_ms:.2f} ms/query")
+    for refine in (None, full):
+        print("PQ scores only:" if refine is None else f"Refined (exact re-score of top {k * 10}):")
+        for nprobe in (1, 4, 8, 16, 32):
+            if nprobe > index.n_lists:
+                break
+            start = time.perf_counter()
+            for q in queries:
+                index.search(q, k, nprobe, refine)
+            ann_ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = recall_at_k(index, vectors, queries, k, nprobe, refine, ids)
+            print(f"  nprobe={nprobe:>3}: recall@{k} = {recall:.3f}   {ann_ms:.2f} ms/query")
+
+
+def file_entries(store):
+    """
+    One row per (store row, commit, file, version) for the whole-file texts of
+    source_file that are embedded in the store, sorted by store row
+    """
+    df = attach_text(pd.read_csv(source_file), ContentStore(), ["Source Code Before", "Source Code After"])
+    entries = []
+    for version in ("Before", "After"):
+        for commit, name, text in zip(df["Commit Hash"], df["File Name"], df[f"Source Code {version}"]):
+            # similarity.py embeds str(text), so a missing version is the text "nan"
+            sha = text_sha(str(text))
+            if sha in store:
+                entries.append((store.rows[sha], sha, commit, name, version))
+    entries = pd.DataFrame(entries, columns=["Row", "SHA", "Commit Hash", "File Name", "Version"])
+    return entries.sort_values(["Row", "Commit Hash", "File Name"], kind="stable", ignore_index=True)
+
+
+def _store_vectors(store):
+    """(store rows, vectors) of the embedded dataset files, empty-text rows skipped"""
+    rows = np.unique(file_entries(store)["Row"].to_numpy(np.int64))
+    vectors = np.asarray(store.matrix[rows])
+    keep = np.linalg.norm(vectors, axis=1) > 0
+    if not keep.any():
+        print(f"⚠️ No file embeddings of {source_file} in {embedding_cache} - run similarity.py first")
+        sys.exit(1)
+    return rows[keep], vectors[keep]
+
+
+def similar(index, store, entries, commit, file_name=None, k=10):
+    """The k fixes (after versions) closest to the after version of commit / file_name"""
+    match = entries[(entries["Commit Hash"] == commit) & (entries["Version"] == "After")]
+    if file_name is not None:
+        match = match[match["File Name"] == file_name]
+    if match.empty:
+        raise KeyError(f"No indexed after version for {commit} {file_name or ''}".strip())
+    row = int(match["Row"].iloc[0])
+    fixes = entries[entries["Version"] == "After"].set_index("Row")
+
+    # Widen the search until k after versions are found or every list is scanned
+    want, nprobe = k + 1, index.nprobe
+    while True:
+        ids, scores = index.search(store.matrix[row], want, nprobe=nprobe, refine=store.matrix)
+        found = []
+        for i, score in zip(ids.tolist(), scores.tolist()):
+            if i == row or i not in fixes.index:
+                continue  # the query itself / a text only indexed as a before version
+            hit = fixes.loc[[i]].iloc[0]
+            found.append((hit["Commit Hash"], hit["File Name"], score))
+        if len(found) >= k:
+            return found[:k]
+        if len(ids) == want:
+            want *= 2
+        elif nprobe < index.n_lists:
+            nprobe = min(2 * nprobe, index.n_lists)
+        else:
+            return found
+
+
+def check():
+    """Fewer vectors than lists, and similar() on an index mostly holding before versions"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(100, 768)).astype(np.float32)
+    index = IVFPQIndex().train(vectors).add(vectors)
+    assert index.n_lists == 100 and len(index.list_ptr) == 101 and index.list_ptr[-1] == 100
+    ids, _ = index.search(vectors[7], 5, refine=vectors)
+    assert ids[0] == 7, ids
+
+    # Only every 10th row is an after version: k + 1 results cannot hold k of them
+    entries = pd.DataFrame({"Row": np.arange(100), "Commit Hash": [f"c{i}" for i in range(100)],
+                            "File Name": "f.py", "Version": np.where(np.arange(100) % 10, "Before", "After")})
+    store = SimpleNamespace(matrix=vectors)
+    found = similar(IVFPQIndex(n_lists=10, nprobe=1).train(vectors).add(vectors), store, entries, "c0", k=5)
+    assert len(found) == 5 and "c0" not in [c for c, _, _ in found], found
+    print("✓ IVF-PQ index checks passed")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "eval"
+    if command == "build":
+        store = EmbeddingStore(embedding_cache)
+        rows, vectors = _store_vectors(store)
+        n_lists = max(1, min(1024, int(np.sqrt(len(vectors)))))
+        index = IVFPQIndex(n_lists=n_lists).train(vectors).add(vectors, ids=rows)
+        index.save(index_file)
+        entries = file_entries(store)
+        entries[entries["Row"].isin(rows)].to_csv(entries_file, index=False)
+        print(f"✓ Indexed {len(vectors)} file embeddings ({n_lists} lists) -> {index_file}, {entries_file}")
+    elif command == "eval":
+        k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        store = EmbeddingStore(embedding_cache)
+        rows, vectors = _store_vectors(store)
+        index = IVFPQIndex.load(index_file)
+        queries = vectors[np.random.default_rng(1).choice(len(vectors), min(100, len(vectors)), replace=False)]
+        report(index, vectors, queries, k, ids=rows, full=store.matrix)
+    elif command == "similar":
+        if len(sys.argv) < 3:
+            print("Usage: python ann_index.py similar COMMIT [FILE] [k]")
+            sys.exit(1)
+        args = sys.argv[3:]
+        k = int(args.pop()) if args and args[-1].isdigit() else 10
+        store = EmbeddingStore(embedding_cache)
+        index = IVFPQIndex.load(index_file)
+        entries = pd.read_csv(entries_file)
+        for commit, name, score in similar(index, store, entries, sys.argv[2], args[0] if args else None, k):
+            print(f"{score:.4f}  {commit}  {name}")
+    elif command == "bench":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        rng = np.random.default_rng(0)
+        # Two-level clustered synthetic data shaped like 768-dim embeddings:
+        # topics, variants of a topic, then per-vector noise
+        topics = rng.normal(size=(200, 768)).astype(np.float32)
+        variants = topics[rng.integers(0, 200, 5000)] + 0.5 * rng.normal(size=(5000, 768)).astype(np.float32)
+        vectors = variants[rng.integers(0, 5000, n)] + 0.25 * rng.normal(size=(n, 768)).astype(np.float32)
+        start = time.perf_counter()
+        index = IVFPQIndex(n_lists=int(np.sqrt(n))).train(vectors).add(vectors)
+        print(f"Built in {time.perf_counter() - start:.1f}s")
+        report(index, vectors, vectors[rng.choice(n, 100, replace=False)], 10)
+    elif command == "check":
+        check()
+    else:
+        print(f"Unknown command '{command}'")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
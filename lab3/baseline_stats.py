@@ -1,38 +1,56 @@
+"""
+Baseline statistics of the bug-fixing commits and the files they touch.
+
+The default mode keeps every modified file in memory and counts with
+Counter. --sketch streams both CSVs in chunks into mergeable sketches
+(sketches.py) instead - HyperLogLog for distinct files, Count-Min + heap for
+the top extensions / filenames / fix types, t-digest for files per commit -
+so memory stays bounded however many file touches there are. Both modes
+draw the same plots.
+
+Usage: python baseline_stats.py [--sketch]
+"""
+
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from collections import Counter
 
+from sketches import CountMinTopK, HyperLogLog, TDigest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import DATASETS, dataset_path, file_extension, load  # noqa: E402
+
 plt.style.use("seaborn-v0_8-muted")
 
+commits_file = dataset_path("bug_fixing_commits")
+files_file = dataset_path("commit_predictions")
 
-def main():
-    commits_data = pd.read_csv("../lab2/bug_fixing_commits.csv")
-    num_commits = len(commits_data)
+CHUNK_ROWS = 100_000  # rows per shard in --sketch mode
+TOP_K = 8
 
-    modified_files_all = []
-    modified_files_count = []
 
-    for entry in commits_data["modified_files"]:
-        if isinstance(entry, str):
-            try:
-                parsed_files = eval(entry)  # Convert string list to actual list
-            except Exception:
-                parsed_files = [entry]
-            modified_files_all.extend(parsed_files)
-            modified_files_count.append(len(parsed_files))
-        else:
-            modified_files_count.append(0)
+def files_column(columns):
+    # bug_fixing.py writes "modified_files", git_log_miner.py "List of modified files"
+    return "modified_files" if "modified_files" in columns else "List of modified files"
 
-    num_files = len(modified_files_all)
-    avg_files_per_commit = num_files / num_commits if num_commits else 0
 
-    print(f"Commits: {num_commits}")
-    print(f"Files: {num_files}")
-    print(f"Avg files/commit: {avg_files_per_commit:.2f}")
+def parse_files(entry):
+    """List of modified files from its string form; None when the cell is empty"""
+    if not isinstance(entry, str):
+        return None
+    try:
+        return eval(entry)  # Convert string list to actual list
+    except Exception:
+        return [entry]
 
-    # ------------------------------
-    # Plot: Summary bar chart
-    # ------------------------------
+
+# ---------------- Plots ---------------- #
+
+def plot_summary(num_commits, num_files, avg_files_per_commit):
     summary_labels = ["Commits", "Files", "Avg Files/Commit"]
     summary_values = [num_commits, num_files, avg_files_per_commit]
 
@@ -55,13 +73,12 @@ def main():
     plt.savefig("summary_overview.png")
     plt.close()
 
-    # ------------------------------
-    # Plot: Histogram of files per commit
-    # ------------------------------
+
+def plot_files_histogram(counts, bins):
     plt.figure(figsize=(8, 5))
-    counts, bins, _ = plt.hist(modified_files_count,
-                               bins=range(1, max(modified_files_count) + 2),
-                               color="#8172B2", edgecolor="black", alpha=0.8)
+    # One weighted sample per bin draws the same bars as the raw values would
+    plt.hist(bins[:-1], bins=bins, weights=counts,
+             color="#8172B2", edgecolor="black", alpha=0.8)
     plt.xlabel("Files per Commit")
     plt.ylabel("Number of Commits")
     plt.title("Distribution of Modified Files per Commit", fontsize=14, weight="bold")
@@ -76,88 +93,187 @@ def main():
     plt.savefig("files_per_commit_histogram.png")
     plt.close()
 
+
+def plot_extensions(ext_top):
+    if not ext_top:
+        return
+    ext_labels, ext_freqs = zip(*ext_top)
+    plt.figure(figsize=(8, 4))
+    bars = plt.bar(ext_labels, ext_freqs,
+                   color="#64B5CD", edgecolor="black")
+    plt.title("Most Common File Extensions", fontsize=14, weight="bold")
+    plt.xlabel("Extension")
+    plt.ylabel("Frequency")
+    plt.grid(axis="y", linestyle="--", alpha=0.6)
+
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width() / 2,
+                 height + 0.3, str(int(height)),
+                 ha="center", fontsize=10)
+
+    plt.tight_layout()
+    plt.savefig("common_extensions.png")
+    plt.close()
+
+
+def plot_top_barh(top, title, ylabel, color, output):
+    if not top:
+        return
+    labels, freqs = zip(*top)
+    plt.figure(figsize=(10, 5))
+    bars = plt.barh(labels, freqs,
+                    color=color, edgecolor="black")
+    plt.title(title, fontsize=14, weight="bold")
+    plt.xlabel("Frequency")
+    plt.ylabel(ylabel)
+    plt.grid(axis="x", linestyle="--", alpha=0.6)
+
+    for bar in bars:
+        width = bar.get_width()
+        plt.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
+                 str(int(width)),
+                 va="center", fontsize=10)
+
+    plt.tight_layout()
+    plt.savefig(output)
+    plt.close()
+
+
+def plot_filenames(file_counts):
+    plot_top_barh(file_counts, "Top Modified Filenames", "Filename", "#DD8452", "common_filenames.png")
+
+
+def plot_fix_types(fix_top):
+    plot_top_barh(fix_top, "Most Common Fix Types", "Fix Type", "#55A868", "fix_type_distribution.png")
+
+
+# ---------------- Exact (in-memory) statistics ---------------- #
+
+def main():
+    commits_data = load("bug_fixing_commits")
+    num_commits = len(commits_data)
+
+    modified_files_all = []
+    modified_files_count = []
+
+    for entry in commits_data[files_column(commits_data.columns)]:
+        parsed_files = parse_files(entry)
+        if parsed_files is not None:
+            modified_files_all.extend(parsed_files)
+            modified_files_count.append(len(parsed_files))
+        else:
+            modified_files_count.append(0)
+
+    num_files = len(modified_files_all)
+    avg_files_per_commit = num_files / num_commits if num_commits else 0
+
+    print(f"Commits: {num_commits}")
+    print(f"Files: {num_files}")
+    print(f"Avg files/commit: {avg_files_per_commit:.2f}")
+
+    plot_summary(num_commits, num_files, avg_files_per_commit)
+    counts, bins = np.histogram(modified_files_count, bins=range(1, max(modified_files_count) + 2))
+    plot_files_histogram(counts, bins)
+
     # ------------------------------
     # Load file-level dataset
     # ------------------------------
-    files_data = pd.read_csv("../lab2/commit_predictions.csv")
+    files_data = load("commit_predictions", derived=True)
 
     # Top file extensions
-    extensions = [fname.split(".")[-1] for fname in files_data["File Name"]
-                  if isinstance(fname, str) and "." in fname]
-    ext_top = Counter(extensions).most_common(8)
-
-    if ext_top:
-        ext_labels, ext_freqs = zip(*ext_top)
-        plt.figure(figsize=(8, 4))
-        bars = plt.bar(ext_labels, ext_freqs,
-                       color="#64B5CD", edgecolor="black")
-        plt.title("Most Common File Extensions", fontsize=14, weight="bold")
-        plt.xlabel("Extension")
-        plt.ylabel("Frequency")
-        plt.grid(axis="y", linestyle="--", alpha=0.6)
-
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width() / 2,
-                     height + 0.3, str(int(height)),
-                     ha="center", fontsize=10)
-
-        plt.tight_layout()
-        plt.savefig("common_extensions.png")
-        plt.close()
+    plot_extensions(Counter(files_data["Extension"].dropna()).most_common(TOP_K))
 
-    # ------------------------------
     # Top modified filenames
-    # ------------------------------
-    file_counts = Counter(files_data["File Name"]).most_common(8)
-    if file_counts:
-        file_labels, file_freqs = zip(*file_counts)
-        plt.figure(figsize=(10, 5))
-        bars = plt.barh(file_labels, file_freqs,
-                        color="#DD8452", edgecolor="black")
-        plt.title("Top Modified Filenames", fontsize=14, weight="bold")
-        plt.xlabel("Frequency")
-        plt.ylabel("Filename")
-        plt.grid(axis="x", linestyle="--", alpha=0.6)
-
-        for bar in bars:
-            width = bar.get_width()
-            plt.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
-                     str(int(width)),
-                     va="center", fontsize=10)
-
-        plt.tight_layout()
-        plt.savefig("common_filenames.png")
-        plt.close()
+    plot_filenames(Counter(files_data["File Name"]).most_common(TOP_K))
 
-    # ------------------------------
     # Fix type distribution (LLM inference)
-    # ------------------------------
     if "LLM Inference (fix type)" in files_data.columns:
         fix_types = [ft for ft in files_data["LLM Inference (fix type)"]
                      if isinstance(ft, str)]
-        fix_top = Counter(fix_types).most_common(8)
+        plot_fix_types(Counter(fix_types).most_common(TOP_K))
+
+
+# ---------------- Streaming sketches ---------------- #
+
+class BaselineSketch:
+    """Everything the plots need, in bounded memory; merge() combines shards"""
+
+    def __init__(self):
+        self.num_commits = 0
+        self.num_files = 0
+        self.distinct_files = HyperLogLog()
+        self.files_per_commit = TDigest()
+        self.extensions = CountMinTopK(TOP_K)
+        self.filenames = CountMinTopK(TOP_K)
+        self.fix_types = CountMinTopK(TOP_K)
 
-        if fix_top:
-            fix_labels, fix_freqs = zip(*fix_top)
-            plt.figure(figsize=(10, 5))
-            bars = plt.barh(fix_labels, fix_freqs,
-                            color="#55A868", edgecolor="black")
-            plt.title("Most Common Fix Types", fontsize=14, weight="bold")
-            plt.xlabel("Frequency")
-            plt.ylabel("Fix Type")
-            plt.grid(axis="x", linestyle="--", alpha=0.6)
+    def add_commits(self, chunk):
+        for entry in chunk[files_column(chunk.columns)]:
+            parsed_files = parse_files(entry) or []
+            self.num_commits += 1
+            self.num_files += len(parsed_files)
+            self.files_per_commit.add(len(parsed_files))
+            self.distinct_files.update(f for f in parsed_files if f is not None)
 
-            for bar in bars:
-                width = bar.get_width()
-                plt.text(width + 0.5, bar.get_y() + bar.get_height() / 2,
-                         str(int(width)),
-                         va="center", fontsize=10)
+    def add_files(self, chunk):
+        names = chunk["File Name"]
+        self.extensions.update(e for e in map(file_extension, names) if e is not None)
+        self.filenames.update(names)
+        if "LLM Inference (fix type)" in chunk.columns:
+            self.fix_types.update(ft for ft in chunk["LLM Inference (fix type)"] if isinstance(ft, str))
+
+    def merge(self, other):
+        self.num_commits += other.num_commits
+        self.num_files += other.num_files
+        self.distinct_files.merge(other.distinct_files)
+        self.files_per_commit.merge(other.files_per_commit)
+        self.extensions.merge(other.extensions)
+        self.filenames.merge(other.filenames)
+        self.fix_types.merge(other.fix_types)
+        return self
+
+
+def sketch_csvs(commits_path=commits_file, files_path=files_file, chunk_rows=CHUNK_ROWS):
+    """Sketch each chunk on its own and merge - the same path shards from elsewhere take"""
+    total = BaselineSketch()
+    for chunk in pd.read_csv(commits_path, chunksize=chunk_rows, dtype=DATASETS["bug_fixing_commits"].dtypes):
+        shard = BaselineSketch()
+        shard.add_commits(chunk)
+        total.merge(shard)
+    for chunk in pd.read_csv(files_path, chunksize=chunk_rows, dtype=DATASETS["commit_predictions"].dtypes):
+        shard = BaselineSketch()
+        shard.add_files(chunk)
+        total.merge(shard)
+    return total
+
+
+def main_sketch():
+    sketch = sketch_csvs()
+    num_commits, num_files = sketch.num_commits, sketch.num_files
+    avg_files_per_commit = num_files / num_commits if num_commits else 0
+    digest = sketch.files_per_commit
+
+    print(f"Commits: {num_commits}")
+    print(f"Files: {num_files}")
+    print(f"Avg files/commit: {avg_files_per_commit:.2f}")
+    print(f"Distinct files: ~{sketch.distinct_files.count():.0f} "
+          f"(±{sketch.distinct_files.relative_error:.2%} std. error)")
+    print("Files/commit quantiles: " + ", ".join(
+        f"p{int(q * 100)}={digest.quantile(q):.1f} (rank ±{digest.rank_error(q):.2%})" for q in (0.5, 0.9, 0.99)))
+    print(f"Top-k counts overestimate by at most {sketch.filenames.error_bound:.0f} "
+          f"(probability {1 - sketch.filenames.delta:.0%})")
 
-            plt.tight_layout()
-            plt.savefig("fix_type_distribution.png")
-            plt.close()
+    plot_summary(num_commits, num_files, avg_files_per_commit)
+    bins = np.arange(1, (int(digest.max) if num_commits else 0) + 2)
+    plot_files_histogram(digest.histogram(bins), bins)
+    plot_extensions(sketch.extensions.most_common(TOP_K))
+    plot_filenames(sketch.filenames.most_common(TOP_K))
+    plot_fix_types(sketch.fix_types.most_common(TOP_K))
 
 
 if __name__ == "__main__":
-    main()
+    if "--sketch" in sys.argv[1:]:
+        main_sketch()
+    else:
+        main()
@@ -1,4 +1,9 @@
-import pandas as pd
-df = pd.read_csv("../lab2/commit_predictions.csv")
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import load  # noqa: E402
+
+df = load("commit_predictions")
 print(df.head())
 print(df.columns)
@@ -0,0 +1,100 @@
+"""
+Chunk-level CodeBERT embeddings for files longer than one 512-token window.
+
+A file is cut into line-aligned chunks whose boundaries are content-defined:
+a chunk ends after a line whose hash hits a fixed pattern (or when it gets
+too long). Editing a few lines therefore only changes the chunks around the
+edit - every other chunk is byte-identical to its counterpart in the other
+version, so its SHA is already in the EmbeddingStore and it is not embedded
+again. File vectors are the token-weighted mean of their chunk vectors.
+"""
+
+import zlib
+
+import numpy as np
+
+# Chunking parameters: ~12 lines on average, and never more tokens than fit
+# in CodeBERT's 512-token window (minus <s>/</s> and a little BPE slack).
+MIN_LINES = 4
+MAX_TOKENS = 480
+BOUNDARY_MOD = 8
+
+
+def split_chunks(text, line_tokens=None, min_lines=MIN_LINES, max_tokens=MAX_TOKENS,
+                 boundary_mod=BOUNDARY_MOD):
+    """
+    Split text into content-defined, line-aligned chunks.
+    line_tokens gives the token count of each line (whitespace words if None).
+    Returns (chunks, chunk token counts).
+    """
+    lines = text.splitlines(keepends=True)
+    if line_tokens is None:
+        line_tokens = [len(line.split()) for line in lines]
+
+    chunks, weights = [], []
+    start, size = 0, 0
+    for i, line in enumerate(lines):
+        # A line that would overflow the window starts a new chunk
+        if i > start and size + line_tokens[i] > max_tokens:
+            chunks.append("".join(lines[start:i]))
+            weights.append(size)
+            start, size = i, 0
+        size += line_tokens[i]
+        at_boundary = zlib.crc32(line.strip().encode("utf-8", errors="replace")) % boundary_mod == 0
+        if i + 1 - start >= min_lines and at_boundary:
+            chunks.append("".join(lines[start:i + 1]))
+            weights.append(size)
+            start, size = i + 1, 0
+    if start < len(lines):
+        chunks.append("".join(lines[start:]))
+        weights.append(size)
+    return chunks, weights
+
+
+class ChunkedEmbedder:
+    """
+    Drop-in for EmbeddingEngine.embed that pools chunk embeddings.
+    Wrap an engine that has an EmbeddingStore so chunks are cached.
+    """
+
+    def __init__(self, engine, **chunk_options):
+        self.engine = engine
+        self.chunk_options = chunk_options
+        self.last_stats = {}
+
+    def embed(self, texts):
+        owners, chunks, weights = [], [], []
+        tokenizer = self.engine.tokenizer
+        for i, text in enumerate(texts):
+            if not (isinstance(text, str) and text.strip()):
+                continue
+            lines = text.splitlines(keepends=True)
+            line_tokens = [len(ids) for ids in
+                           tokenizer(lines, add_special_tokens=False)["input_ids"]]
+            text_chunks, text_weights = split_chunks(text, line_tokens, **self.chunk_options)
+            owners += [i] * len(text_chunks)
+            chunks += text_chunks
+            weights += text_weights
+
+        store = self.engine.store
+        cached_before = len(store) if store is not None else 0
+        vectors = self.engine.embed(chunks) if chunks else np.zeros((0, 1), dtype=np.float32)
+        self.last_stats = {
+            "chunks": len(chunks),
+            "distinct": len(set(chunks)),
+            "embedded": (len(store) - cached_before) if store is not None else len(set(chunks)),
+        }
+
+        hidden = self.engine.model.config.hidden_size
+        out = np.zeros((len(texts), hidden), dtype=np.float32)
+        if not chunks:
+            return out
+
+        # Token-weighted mean over chunks ~ mean over the whole file's tokens
+        owners = np.array(owners)
+        weights = np.array(weights, dtype=np.float64)
+        np.add.at(out, owners, vectors * weights[:, None])
+        totals = np.bincount(owners, weights=weights, minlength=len(texts))
+        nonzero = totals > 0
+        out[nonzero] /= totals[nonzero, None]
+        return out
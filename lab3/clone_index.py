@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Function-granularity clone index over every Python version in lab2/codes.
+
+Each function (methods and nested functions included) gets two hashes:
+- Type-1: its AST dump - identical code up to whitespace, comments and layout
+- Type-2: its normalized subtree hash from structural_similarity.tree_nodes -
+  identifiers dropped and literals reduced to their type, so renamed copies
+  match too
+
+Occurrences live in flat arrays sorted by hash (the inverted index): the
+clones of a function are one searchsorted away. Versions already indexed
+are skipped, so re-running build only parses what arrived since.
+
+Usage: python clone_index.py build                       - index new versions in lab2/codes
+       python clone_index.py query <file> <function>     - clones of a function in any revision
+"""
+
+import ast
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from structural_similarity import tree_nodes
+
+codes_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab2", "codes")
+index_file = "clone_index.npz"
+
+MIN_NODES = 25  # smaller functions (getters, one-line wrappers) are clones of everything
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def version_label(path):
+    """(commit hash, file name, before / after) from codes/<hash>_<name>_<side>.txt"""
+    stem = os.path.basename(path)[:-len(".txt")]
+    commit, rest = stem.split("_", 1)
+    name, side = rest.rsplit("_", 1)
+    return commit, name, side
+
+
+# ---------------- Pool worker ---------------- #
+
+def _functions(tree):
+    """(qualified name, node) for every function, outer ones first"""
+    out = []
+    stack = [(tree, "")]
+    while stack:
+        node, prefix = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = prefix + child.name
+                if not isinstance(child, ast.ClassDef):
+                    out.append((name, child))
+                stack.append((child, name + "."))
+            else:
+                stack.append((child, prefix))
+    return out
+
+
+def file_functions(path):
+    """[(name, first line, last line, type-1 hash, type-2 hash, nodes)]; [] if not Python"""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            tree = ast.parse(f.read())
+    except (SyntaxError, ValueError):
+        return []
+    rows = []
+    for name, node in _functions(tree):
+        _, sizes, hashes = tree_nodes(node)
+        if sizes[0] < MIN_NODES:
+            continue
+        type1 = _hash64(ast.dump(node).encode())
+        type2 = int.from_bytes(hashes[0], "little")
+        rows.append((name, node.lineno, node.end_lineno, type1, type2, sizes[0]))
+    return rows
+
+
+# ---------------- Index ---------------- #
+
+class CloneIndex:
+    def __init__(self, paths=None, occ_file=None, names=None, lines=None, type1=None, type2=None, nodes=None):
+        self.paths = list(paths or [])
+        self.occ_file = occ_file if occ_file is not None else np.zeros(0, np.int64)
+        self.names = names if names is not None else np.zeros(0, dtype=str)
+        self.lines = lines if lines is not None else np.zeros((0, 2), np.int64)
+        self.type1 = type1 if type1 is not None else np.zeros(0, np.uint64)
+        self.type2 = type2 if type2 is not None else np.zeros(0, np.uint64)
+        self.nodes = nodes if nodes is not None else np.zeros(0, np.int64)
+        self._sort()
+
+    def _sort(self):
+        # Inverted index: occurrence ids ordered by each hash, and the hashes in that order
+        self.by_type1 = np.argsort(self.type1, kind="stable")
+        self.by_type2 = np.argsort(self.type2, kind="stable")
+        self.sorted_type1 = self.type1[self.by_type1]
+        self.sorted_type2 = self.type2[self.by_type2]
+
+    def __len__(self):
+        return len(self.occ_file)
+
+    # ---------------- Building ---------------- #
+
+    def add_files(self, paths, workers=None):
+        """Index versions not seen yet, in parallel; returns how many were added"""
+        known = set(self.paths)
+        new = [p for p in paths if p not in known]
+        if not new:
+            return 0
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            results = [file_functions(p) for p in new]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(file_functions, new, chunksize=32))
+
+        first = len(self.paths)
+        self.paths.extend(new)
+        rows = [(first + i,) + r for i, found in enumerate(results) for r in found]
+        if rows:
+            file_ids, names, starts, ends, type1, type2, nodes = zip(*rows)
+            self.occ_file = np.concatenate([self.occ_file, np.array(file_ids, np.int64)])
+            self.names = np.concatenate([self.names, np.array(names, dtype=str)])
+            self.lines = np.concatenate([self.lines, np.column_stack([starts, ends]).astype(np.int64)])
+            self.type1 = np.concatenate([self.type1, np.array(type1, np.uint64)])
+            self.type2 = np.concatenate([self.type2, np.array(type2, np.uint64)])
+            self.nodes = np.concatenate([self.nodes, np.array(nodes, np.int64)])
+            self._sort()
+        return len(new)
+
+    # ---------------- Queries ---------------- #
+
+    def _lookup(self, sorted_hashes, order, value):
+        lo = np.searchsorted(sorted_hashes, value, side="left")
+        hi = np.searchsorted(sorted_hashes, value, side="right")
+        return order[lo:hi]
+
+    def find(self, path, name):
+        """Occurrence ids of function `name` in an indexed version"""
+        if path not in self.paths:
+            return np.zeros(0, np.int64)
+        file_id = self.paths.index(path)
+        return np.flatnonzero((self.occ_file == file_id) & (self.names == name))
+
+    def clones(self, occurrence):
+        """[(occurrence id, clone type)] of one occurrence, itself excluded; Type-1 first"""
+        exact = self._lookup(self.sorted_type1, self.by_type1, self.type1[occurrence])
+        renamed = self._lookup(self.sorted_type2, self.by_type2, self.type2[occurrence])
+        exact_set = set(exact.tolist())
+        hits = [(int(i), 1) for i in exact if i != occurrence]
+        hits += [(int(i), 2) for i in renamed if i != occurrence and int(i) not in exact_set]
+        return hits
+
+    def describe(self, occurrence):
+        commit, name, side = version_label(self.paths[self.occ_file[occurrence]])
+        first, last = self.lines[occurrence]
+        return f"{commit[:10]} {name} ({side}) {self.names[occurrence]} lines {first}-{last}"
+
+    # ---------------- Persistence ---------------- #
+
+    def save(self, path):
+        np.savez_compressed(path, paths=np.array(self.paths, dtype=str), occ_file=self.occ_file,
+                            names=self.names, lines=self.lines, type1=self.type1,
+                            type2=self.type2, nodes=self.nodes)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(data["paths"].tolist(), data["occ_file"], data["names"], data["lines"],
+                       data["type1"], data["type2"], data["nodes"])
+
+
+def python_versions(directory=codes_dir):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith((".py_before.txt", ".py_after.txt")))
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    index = CloneIndex.load(index_file)
+
+    if command == "build":
+        added = index.add_files(python_versions())
+        index.save(index_file)
+        groups = np.unique(index.type2, return_counts=True)[1]
+        print(f"✓ Parsed {added} new versions ({len(index.paths)} indexed, {len(index)} functions) -> {index_file}")
+        print(f"✓ {int((groups > 1).sum())} Type-2 clone groups covering {int(groups[groups > 1].sum())} functions")
+    elif command == "query":
+        if len(sys.argv) < 4:
+            print("Usage: python clone_index.py query <file> <function>")
+            sys.exit(1)
+        path = sys.argv[2]
+        if path not in index.paths:
+            path = os.path.join(codes_dir, os.path.basename(path))
+        found = index.find(path, sys.argv[3])
+        if not len(found):
+            print(f"{sys.argv[3]} is not indexed in {sys.argv[2]} (run build, or it has < {MIN_NODES} nodes)")
+            sys.exit(1)
+        for occurrence in found:
+            hits = index.clones(occurrence)
+            files = {version_label(index.paths[index.occ_file[o]])[1] for o, _ in hits}
+            print(f"{index.describe(occurrence)}: {len(hits)} clones in {len(files)} files")
+            for other, clone_type in hits:
+                print(f"  Type-{clone_type}  {index.describe(other)}")
+    else:
+        print(f"Unknown command '{command}'")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Content store for the source text behind the lab3 tables.
+
+The full tables the lab3 stages used to write (commit_with_metrics.csv,
+commit_with_similarity.csv) inlined the before / after code and the diff as
+quoted multi-line cells, so every read_csv of them parsed megabytes of code
+- also in scripts that only look at scores.
+Here every distinct text is kept once, zlib-compressed, in an append-only
+pack file addressed by its git blob hash. The slim tables carry only the
+keys ("Before Key", "After Key", "Diff Key"); a stage that needs the text
+asks for those columns and gets them read back from the pack, in offset
+order, for its rows only.
+
+Usage: python content_store.py    - split old full CSVs, if present, into slim tables + store
+"""
+
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+store_dir = "content_store"
+
+# Text column -> key column in the slim tables
+TEXT_COLUMNS = {
+    "Source Code Before": "Before Key",
+    "Source Code After": "After Key",
+    "Diff": "Diff Key",
+}
+
+# Full CSV -> slim table
+SPLITS = [
+    ("commit_with_metrics.csv", "commit_metrics.csv"),
+    ("commit_with_similarity.csv", "commit_similarity.csv"),
+]
+
+
+def blob_hash(text):
+    """Same id git gives the file content"""
+    data = text.encode("utf-8", errors="replace")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class ContentStore:
+    def __init__(self, directory=store_dir):
+        self.directory = directory
+        self.pack_path = os.path.join(directory, "pack.bin")
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)  # key -> [offset, compressed length]
+        else:
+            self.index = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def put_many(self, texts):
+        """Keys for texts (None for missing ones); new texts are appended to the pack"""
+        keys = []
+        with open(self.pack_path, "ab") as pack:
+            offset = pack.tell()
+            for text in texts:
+                if not isinstance(text, str):
+                    keys.append(None)
+                    continue
+                key = blob_hash(text)
+                if key not in self.index:
+                    data = zlib.compress(text.encode("utf-8", errors="surrogatepass"))
+                    pack.write(data)
+                    self.index[key] = [offset, len(data)]
+                    offset += len(data)
+                keys.append(key)
+        return keys
+
+    def get_many(self, keys):
+        """Texts for keys (NaN where the key is missing), reading the pack in offset order"""
+        out = [np.nan] * len(keys)
+        wanted = sorted((self.index[k][0], self.index[k][1], i) for i, k in enumerate(keys)
+                        if isinstance(k, str) and k in self.index)
+        if not wanted:
+            return out
+        with open(self.pack_path, "rb") as pack:
+            for offset, length, i in wanted:
+                pack.seek(offset)
+                out[i] = zlib.decompress(pack.read(length)).decode("utf-8", errors="surrogatepass")
+        return out
+
+    def save(self):
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+
+
+def split_table(df, store):
+    """Slim copy of df: every text column replaced by its key column, in place"""
+    df = df.copy()
+    for text_col, key_col in TEXT_COLUMNS.items():
+        if text_col in df.columns:
+            position = df.columns.get_loc(text_col)
+            keys = store.put_many(df[text_col])
+            df = df.drop(columns=[text_col])
+            df.insert(position, key_col, keys)
+    return df
+
+
+def attach_text(df, store, columns=("Source Code Before", "Source Code After")):
+    """df with the requested text columns loaded from the store, next to their keys"""
+    df = df.copy()
+    for text_col in columns:
+        key_col = TEXT_COLUMNS[text_col]
+        df.insert(df.columns.get_loc(key_col) + 1, text_col, store.get_many(list(df[key_col])))
+    return df
+
+
+def drop_text(df):
+    """Slim table to write out: text columns dropped, keys kept"""
+    return df.drop(columns=[c for c in TEXT_COLUMNS if c in df.columns])
+
+
+def main():
+    store = ContentStore()
+    for full_csv, slim_csv in SPLITS:
+        if not os.path.exists(full_csv):
+            print(f"⚠️ {full_csv} not found, skipping")
+            continue
+        df = pd.read_csv(full_csv)
+        slim = split_table(df, store)
+        slim.to_csv(slim_csv, index=False)
+
+        # The text must come back exactly as read_csv parsed it
+        restored = attach_text(slim, store, [c for c in TEXT_COLUMNS if c in df.columns])
+        assert restored[df.columns].equals(df), f"{full_csv} does not round-trip"
+        print(f"✓ {full_csv} ({os.path.getsize(full_csv) / 1e6:.2f} MB) -> "
+              f"{slim_csv} ({os.path.getsize(slim_csv) / 1e6:.2f} MB)")
+    store.save()
+    print(f"✓ {len(store)} distinct texts in {store_dir} "
+          f"({os.path.getsize(store.pack_path) / 1e6:.2f} MB pack)")
+
+
+if __name__ == "__main__":
+    main()
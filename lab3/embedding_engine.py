@@ -0,0 +1,153 @@
+"""
+Batched CodeBERT embedding engine.
+
+All texts are tokenized up front, sorted by token length and cut into
+buckets so each padded batch wastes as little compute on padding as
+possible. Mean pooling only averages real tokens (attention mask), so a
+text gets the same vector whether it is embedded alone or in a batch.
+
+With an EmbeddingStore attached, every distinct text is embedded once and
+served from the on-disk cache afterwards.
+
+The tokenizer and model are loaded (model_loader.py) the first time they
+are needed, so an engine whose texts are all cached never loads them.
+"""
+
+import numpy as np
+
+from embedding_store import text_sha
+from model_loader import MODEL_NAME, check_backend, load_model, load_tokenizer, model_cache
+
+EMBEDDING_DIM = 768
+
+
+class EmbeddingEngine:
+    def __init__(self, model_name=MODEL_NAME, max_length=512, batch_size=16,
+                 max_batch_tokens=8192, tokenizer=None, model=None, store=None,
+                 backend="fp32", cache_dir=model_cache):
+        check_backend(backend)
+        self.model_name = model_name
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.store = store
+        self._tokenizer = tokenizer
+        self._model = model.eval() if model is not None else None
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = load_tokenizer(self.model_name, self.cache_dir)
+        return self._tokenizer
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_model(self.model_name, self.backend, self.cache_dir)
+        return self._model
+
+    def _buckets(self, lengths):
+        """Group indices (sorted by length) so batch_size * longest <= token budget"""
+        order = np.argsort(lengths, kind="stable")
+        batch = []
+        for idx in order:
+            longest = lengths[idx]  # sorted ascending, so the newest item is the longest
+            if batch and (len(batch) >= self.batch_size or
+                          (len(batch) + 1) * longest > self.max_batch_tokens):
+                yield batch
+                batch = []
+            batch.append(idx)
+        if batch:
+            yield batch
+
+    def embed(self, texts):
+        """
+        Embed a list of strings -> float32 array (len(texts), hidden size).
+        Empty / whitespace-only texts get a zero vector, as before.
+        """
+        if self.store is None:
+            return self._embed_batches(texts)
+
+        # Each distinct text is looked up (and, if new, embedded) only once
+        shas = [text_sha(t) if isinstance(t, str) else "" for t in texts]
+        unique = {}
+        for sha, text in zip(shas, texts):
+            unique.setdefault(sha, text)
+        keys = list(unique)
+        vectors, found = self.store.get(keys)
+
+        missing = [i for i in range(len(keys)) if not found[i]]
+        if missing:
+            vectors[missing] = self._embed_batches([unique[keys[i]] for i in missing])
+            self.store.add([keys[i] for i in missing], vectors[missing])
+            self.store.flush()
+
+        position = {sha: i for i, sha in enumerate(keys)}
+        return vectors[[position[sha] for sha in shas]]
+
+    def _embed_batches(self, texts):
+        import torch
+        hidden = self.model.config.hidden_size
+        out = np.zeros((len(texts), hidden), dtype=np.float32)
+        todo = [i for i, t in enumerate(texts) if isinstance(t, str) and t.strip()]
+        if not todo:
+            return out
+
+        encoded = self.tokenizer([texts[i] for i in todo], truncation=True,
+                                 max_length=self.max_length)["input_ids"]
+        lengths = np.array([len(ids) for ids in encoded])
+
+        with torch.no_grad():
+            for batch in self._buckets(lengths):
+                padded = self.tokenizer.pad({"input_ids": [encoded[i] for i in batch]},
+                                            return_tensors="pt")
+                mask = padded["attention_mask"]
+                states = self.model(input_ids=padded["input_ids"], attention_mask=mask).last_hidden_state
+                mask = mask.unsqueeze(-1).to(states.dtype)
+                pooled = (states * mask).sum(dim=1) / mask.sum(dim=1)
+                out[[todo[i] for i in batch]] = pooled.float().numpy()
+        return out
+
+    def embed_pairs(self, firsts, seconds):
+        """
+        Encode each (first, second) pair as one sequence (<s> A </s></s> B </s>)
+        and mean-pool the tokens of the two segments separately. One forward
+        pass per pair -> two float32 arrays; an empty segment pools to zeros.
+        """
+        import torch
+        hidden = self.model.config.hidden_size
+        out_first = np.zeros((len(firsts), hidden), dtype=np.float32)
+        out_second = np.zeros((len(firsts), hidden), dtype=np.float32)
+        if not firsts:
+            return out_first, out_second
+
+        encoded = self.tokenizer(list(firsts), list(seconds), truncation="longest_first",
+                                 max_length=self.max_length)
+        ids = encoded["input_ids"]
+        # 0 / 1 for tokens of the first / second text, -1 for special tokens
+        segments = [[-1 if s is None else s for s in encoded.sequence_ids(i)] for i in range(len(ids))]
+        lengths = np.array([len(x) for x in ids])
+
+        with torch.no_grad():
+            for batch in self._buckets(lengths):
+                padded = self.tokenizer.pad({"input_ids": [ids[i] for i in batch]}, return_tensors="pt")
+                states = self.model(input_ids=padded["input_ids"],
+                                    attention_mask=padded["attention_mask"]).last_hidden_state
+                width = states.shape[1]
+                seg = torch.tensor([segments[i] + [-1] * (width - len(segments[i])) for i in batch])
+                for k, out in ((0, out_first), (1, out_second)):
+                    mask = (seg == k).unsqueeze(-1).to(states.dtype)
+                    pooled = (states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                    out[batch] = pooled.float().numpy()
+        return out_first, out_second
+
+
+def cosine_similarity_rows(a, b):
+    """Row-wise cosine similarity; 0.0 where either vector is all zeros"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    dots = np.einsum("ij,ij->i", a, b)
+    return np.divide(dots, norms, out=np.zeros(len(a)), where=norms > 0)
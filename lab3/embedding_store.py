@@ -0,0 +1,93 @@
+"""
+On-disk embedding cache: one memory-mapped .npy matrix plus a SHA -> row index.
+
+A text is embedded once per model and reused across rows and across runs;
+lookups only touch the rows they need thanks to the memmap.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+DEFAULT_DIR = "embedding_cache"
+
+
+def text_sha(text):
+    return hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, directory=DEFAULT_DIR, dim=768, dtype="float32", model_name=""):
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, "embeddings.npy")
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if model_name and meta["model"] and meta["model"] != model_name:
+                raise ValueError(f"{directory} holds embeddings for {meta['model']}, not {model_name}")
+            self.model_name = meta["model"]
+            self.rows = meta["rows"]
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+        elif os.path.exists(self.matrix_path):
+            # Without the index the rows cannot be told apart; never overwrite them
+            raise FileNotFoundError(f"{self.index_path} is missing but {self.matrix_path} exists - "
+                                    f"restore the index or delete {directory} to start over")
+        else:
+            self.model_name = model_name
+            self.rows = {}
+            self.matrix = np.lib.format.open_memmap(self.matrix_path, mode="w+",
+                                                    dtype=np.dtype(dtype), shape=(1024, dim))
+            self.flush()  # matrix and index always exist together
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, sha):
+        return sha in self.rows
+
+    def _reserve(self, extra):
+        needed = len(self.rows) + extra
+        capacity = self.matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Grow into a new file and swap it in
+        tmp_path = self.matrix_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.matrix.dtype,
+                                          shape=(capacity, self.matrix.shape[1]))
+        grown[:len(self.rows)] = self.matrix[:len(self.rows)]
+        grown.flush()
+        del grown
+        self.matrix = None
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+
+    def get(self, shas):
+        """Return (vectors, found mask); rows for missing SHAs are zero"""
+        rows = np.array([self.rows.get(s, -1) for s in shas], dtype=np.int64)
+        found = rows >= 0
+        out = np.zeros((len(shas), self.matrix.shape[1]), dtype=np.float32)
+        out[found] = self.matrix[rows[found]]
+        return out, found
+
+    def add(self, shas, vectors):
+        new = [(s, v) for s, v in zip(shas, vectors) if s not in self.rows]
+        self._reserve(len(new))
+        for sha, vector in new:
+            row = len(self.rows)
+            self.matrix[row] = vector
+            self.rows[sha] = row
+
+    def flush(self):
+        self.matrix.flush()
+        # Write a new index and swap it in, so a crash never leaves a partial one
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
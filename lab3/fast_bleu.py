@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Sentence BLEU with NumPy n-gram counting.
+
+Gives the same score as
+    nltk sentence_bleu([ref], hyp, smoothing_function=SmoothingFunction().method1)
+for one reference and the default BLEU-4 weights, but tokens are mapped
+to integer ids and the n-grams of both sides are counted with sorted-array
+operations and bincounts instead of Python Counters of tuples.
+
+diff_bleu() gives the same score from a before/after pair plus its unified
+diff, in time that follows the size of the change. The unchanged runs
+between hunks come from the hunk headers. Every blob is scanned once with
+NumPy for its line starts and per-line token counts (cached by blob hash),
+so the length of a run is a lookup. n-grams that lie entirely inside an
+unchanged run are counted with a formula, and only the lines of the windows
+around the hunks are split into tokens. Small files and large changes,
+where localizing costs more than it saves, are counted whole.
+
+Usage: python fast_bleu.py [csv]              - check parity with NLTK and time both
+       python fast_bleu.py --check-diff [csv] - check diff_bleu against whole-file BLEU,
+                                                timed by share of changed lines
+       (csv: a slim table with content-store keys, commit_metrics.csv by default,
+       or a CSV of file paths such as lab2 commit_diffs.csv, run from lab2/)
+"""
+
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from content_store import ContentStore, attach_text, blob_hash
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab2.diff_parser import HUNK_HEADER, REMOVED, parse_diff  # noqa: E402
+
+MAX_N = 4
+WEIGHTS = (0.25, 0.25, 0.25, 0.25)
+EPSILON = 0.1  # SmoothingFunction().method1
+BLEU_VERSION = "bleu4-method1"  # score version in the score store
+
+_blob_cache = {}  # blob hash -> (line start offsets, per-line token offsets)
+_hunk_headers = re.compile(HUNK_HEADER.pattern, re.MULTILINE)
+
+
+def _ngram_codes(ids, n_max):
+    """
+    Yield (n, codes) where codes[i] identifies the n-gram starting at i.
+    Codes are re-ranked after every order so they stay small.
+    """
+    codes = ids
+    vocab = int(ids.max()) + 1 if len(ids) else 1
+    yield 1, codes
+    for n in range(2, n_max + 1):
+        if len(ids) < n:
+            return
+        codes = codes[:-1] * vocab + ids[n - 1:]
+        codes = np.unique(codes, return_inverse=True)[1].reshape(-1)
+        vocab = max(vocab, int(codes.max()) + 1)
+        yield n, codes
+
+
+def modified_counts(ref_tokens, hyp_tokens, n_max=MAX_N):
+    """Clipped n-gram matches and hypothesis n-gram totals for n = 1..n_max"""
+    numerators = np.zeros(n_max, dtype=np.int64)
+    denominators = np.ones(n_max, dtype=np.int64)
+    if not ref_tokens or not hyp_tokens:
+        for n in range(1, n_max + 1):
+            denominators[n - 1] = max(1, len(hyp_tokens) - n + 1)
+        return numerators, denominators
+
+    # Shared integer vocabulary for both sides (dict lookups, no string sort)
+    vocab = {}
+    ids = np.fromiter((vocab.setdefault(t, len(vocab)) for t in ref_tokens + hyp_tokens),
+                      dtype=np.int64, count=len(ref_tokens) + len(hyp_tokens))
+    split = len(ref_tokens)
+
+    # n-gram codes are computed over the concatenation; drop the ones that
+    # straddle the ref/hyp boundary
+    for n, codes in _ngram_codes(ids, n_max):
+        ref_codes = codes[:max(0, split - n + 1)]
+        hyp_codes = codes[split:]
+        denominators[n - 1] = max(1, len(hyp_codes))
+        if len(ref_codes) == 0 or len(hyp_codes) == 0:
+            continue
+        # Codes are dense ranks, so counting is a bincount per side
+        size = int(codes.max()) + 1
+        numerators[n - 1] = np.minimum(np.bincount(ref_codes, minlength=size),
+                                       np.bincount(hyp_codes, minlength=size)).sum()
+    return numerators, denominators
+
+
+def bleu_from_counts(numerators, denominators, ref_len, hyp_len, weights=WEIGHTS):
+    """NLTK's corpus_bleu arithmetic for a single pair, method1 smoothing"""
+    if numerators[0] == 0:
+        return 0
+    if hyp_len > ref_len:
+        bp = 1
+    elif hyp_len == 0:
+        bp = 0
+    else:
+        bp = math.exp(1 - ref_len / hyp_len)
+    precisions = [(int(num) if num else EPSILON) / int(den)
+                  for num, den in zip(numerators, denominators)]
+    return bp * math.exp(math.fsum(w * math.log(p) for w, p in zip(weights, precisions) if p > 0))
+
+
+def sentence_bleu(ref_tokens, hyp_tokens):
+    numerators, denominators = modified_counts(ref_tokens, hyp_tokens)
+    return bleu_from_counts(numerators, denominators, len(ref_tokens), len(hyp_tokens))
+
+
+def compute_bleu(code_before, code_after):
+    """Token similarity of one before/after pair (same rules as similarity.py had)"""
+    if pd.isna(code_before) or pd.isna(code_after):
+        return 0.0
+    ref_tokens = str(code_before).split()
+    hyp_tokens = str(code_after).split()
+    if len(ref_tokens) == 0 or len(hyp_tokens) == 0:
+        return 0.0
+    return sentence_bleu(ref_tokens, hyp_tokens)
+
+
+# ---------------- Diff-localized BLEU ---------------- #
+
+# str.split() whitespace: a table for code points < 256 and the few above
+_SPACE = np.array([chr(c).isspace() for c in range(256)])
+_WIDE_SPACE = np.array([0x1680, *range(0x2000, 0x200B), 0x2028, 0x2029, 0x202F, 0x205F, 0x3000],
+                       dtype=np.uint32)
+
+
+def _code_points(text):
+    """(code points, whitespace mask), indexed like the characters of text"""
+    if text.isascii():
+        codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        return codes, np.take(_SPACE, codes)
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    space = np.take(_SPACE, np.minimum(codes, 255))
+    wide = np.flatnonzero(codes - _WIDE_SPACE[0] <= _WIDE_SPACE[-1] - _WIDE_SPACE[0])  # unsigned: one compare
+    space[wide] = np.isin(codes[wide], _WIDE_SPACE)
+    return codes, space
+
+
+def _blob_layout(text):
+    """
+    Cached (line_starts, token_offsets) of a text, for lines as git numbers
+    them (no phantom line after a final newline): line i is
+    text[line_starts[i]:line_starts[i + 1] - 1] and token_offsets[i] is the
+    number of whitespace tokens before it (len(lines) + 1 entries each).
+    Tokens never span a newline, so these locate any token without
+    splitting the text, and the text is scanned with NumPy.
+    """
+    key = blob_hash(text)
+    if key not in _blob_cache:
+        codes, space = _code_points(text)
+        newlines = np.flatnonzero(codes == 10)
+        token_starts = np.flatnonzero(~space & np.concatenate([[True], space[:-1]]))
+        ends = newlines + 1 if text.endswith("\n") else np.append(newlines, len(text)) + 1
+        line_starts = np.concatenate([[0], ends]).astype(np.int64)
+        per_line = np.bincount(np.searchsorted(line_starts, token_starts, side="right") - 1,
+                               minlength=len(ends))
+        token_offsets = np.zeros(len(ends) + 1, dtype=np.int64)
+        np.cumsum(per_line, out=token_offsets[1:])
+        _blob_cache[key] = (line_starts, token_offsets)
+    return _blob_cache[key]
+
+
+def _line_text(text, line_starts, first, count):
+    """Lines first .. first + count - 1 (0-based) of a text"""
+    segment = text[line_starts[first]:line_starts[first + count]]
+    lines = segment.split("\n")
+    return lines[:-1] if segment.endswith("\n") else lines
+
+
+def _token_slice(text, line_starts, token_offsets, a, b):
+    """Tokens a .. b - 1 of a text; only the lines holding them are split"""
+    if b <= a:
+        return []
+    first = int(np.searchsorted(token_offsets, a, side="right")) - 1
+    last = int(np.searchsorted(token_offsets, b - 1, side="right")) - 1
+    tokens = text[line_starts[first]:line_starts[last + 1]].split()
+    return tokens[a - token_offsets[first]:b - token_offsets[first]]
+
+
+def _hunk_lines(parsed, span):
+    """Content of the lines of one removed / added span, without their +/- marker"""
+    text = parsed.span_text(span)
+    return [line[1:] for line in text.split("\n")[:parsed.spans[span, 3]]]
+
+
+def _shared_runs(old, new, diff_text):
+    """
+    Unchanged line runs [(old_first, new_first, count)] between the hunks, read
+    off the hunk headers; None when the diff does not describe this pair.
+    old / new are (text, line_starts). Only the removed / added lines are
+    compared with the texts - the cost is the size of the change, not of the files.
+    """
+    parsed = parse_diff(diff_text)
+    if not len(parsed.hunks):
+        return None
+    for span in range(len(parsed.spans)):
+        kind, line, length = parsed.spans[span, 1:4]
+        text, line_starts = old if kind == REMOVED else new
+        if line < 1 or line - 1 + length > len(line_starts) - 1 or \
+                _line_text(text, line_starts, line - 1, length) != _hunk_lines(parsed, span):
+            return None
+
+    old_total, new_total = len(old[1]) - 1, len(new[1]) - 1
+    runs = []
+    old_next = new_next = 0  # first line after the previous hunk (0-based)
+    for old_start, old_len, new_start, new_len, _ in parsed.hunks.tolist():
+        # A zero-length side starts after line `start`, otherwise at line `start`
+        old_first = old_start - 1 if old_len else old_start
+        new_first = new_start - 1 if new_len else new_start
+        if old_first - old_next != new_first - new_next or old_first < old_next:
+            return None
+        runs.append((old_next, new_next, old_first - old_next))
+        old_next, new_next = old_first + old_len, new_first + new_len
+    if old_next > old_total or old_total - old_next != new_total - new_next:
+        return None
+    runs.append((old_next, new_next, old_total - old_next))
+    return [run for run in runs if run[2]]
+
+
+def _local_windows(inside, total, n):
+    """
+    Token slices holding every n-gram whose start in [0, total-n] is not
+    covered by an in-run start interval
+    """
+    windows = []
+    cursor = 0
+    for s, e in inside:
+        if e <= s:
+            continue  # run shorter than n
+        if s > cursor:
+            windows.append((cursor, s + n - 1))
+        cursor = e
+    if total > cursor:
+        windows.append((cursor, total))  # may hold fewer than n tokens, then it adds no n-grams
+    return windows
+
+
+def _window_tokens(tokens, windows, runs):
+    """
+    The window tokens (tokens(a, b) gives tokens a .. b - 1), each window
+    followed by a sentinel object that equals nothing else, plus two counts
+    per position: tokens left in its window (0 at a sentinel) and tokens
+    left in the unchanged run it lies in (0 outside runs).
+    """
+    found = []
+    for a, b in windows:
+        found += tokens(a, b)
+        found.append(object())
+    slots = np.array([b - a + 1 for a, b in windows], dtype=np.int64)
+    offsets = np.arange(len(found)) - np.repeat(np.cumsum(slots) - slots, slots)
+    positions = np.repeat(np.array([a for a, _ in windows], dtype=np.int64), slots) + offsets
+    window_left = np.repeat(slots - 1, slots) - offsets
+
+    # An empty run before everything, so every position has a run to look at
+    starts = np.array([-1] + [r for r, _ in runs], dtype=np.int64)
+    ends = np.array([-1] + [r + length for r, length in runs], dtype=np.int64)
+    run = np.searchsorted(starts, positions, side="right") - 1
+    run_left = np.where(window_left > 0, np.maximum(ends[run] - positions, 0), 0)
+    return found, window_left, run_left
+
+
+def diff_bleu(code_before, code_after, diff_text, n_max=MAX_N):
+    """
+    Same value as compute_bleu(code_before, code_after), computed from the
+    diff. Falls back to compute_bleu if the diff does not match the texts.
+    """
+    if pd.isna(code_before) or pd.isna(code_after):
+        return 0.0
+    before, after = str(code_before), str(code_after)
+    if not before or not after or before.isspace() or after.isspace():
+        return 0.0  # no tokens on one side (isspace() and split() agree on whitespace)
+    if pd.isna(diff_text):
+        return compute_bleu(before, after)
+
+    # Localizing has a fixed cost of about 100 lines of whole-file counting and
+    # the windows around the hunks cost more per token, so it only pays when
+    # the unchanged lines outnumber twice the hunk lines plus 100 (constants
+    # from the lab2 commit_diffs.csv timings). Cheap bounds come first: the
+    # line count, then the size of the diff, then the hunk headers alone.
+    diff_text = str(diff_text)
+    total_lines = before.count("\n") + after.count("\n")
+    if total_lines <= 100 or 3 * len(diff_text) > len(before) + len(after):
+        return sentence_bleu(before.split(), after.split())
+    headers = _hunk_headers.findall(diff_text)
+    if not headers:
+        return compute_bleu(before, after)  # binary / mode-only change: nothing to localize
+    hunk_lines = sum(int(old_len or 1) + int(new_len or 1) for _, old_len, _, new_len in headers)
+    if total_lines - hunk_lines <= 2 * hunk_lines + 100:
+        return sentence_bleu(before.split(), after.split())
+
+    old_starts, old_off = _blob_layout(before)
+    new_starts, new_off = _blob_layout(after)
+    ref_len, hyp_len = int(old_off[-1]), int(new_off[-1])
+
+    runs = _shared_runs((before, old_starts), (after, new_starts), diff_text)
+    if runs is None:
+        return compute_bleu(before, after)
+
+    # Unchanged runs as token intervals, from the cached per-line token offsets
+    token_runs = []
+    for old_first, new_first, count in runs:
+        r0, r1 = int(old_off[old_first]), int(old_off[old_first + count])
+        h0, h1 = int(new_off[new_first]), int(new_off[new_first + count])
+        if r1 - r0 != h1 - h0:
+            return compute_bleu(before, after)
+        if r1 > r0:
+            token_runs.append((r0, h0, r1 - r0))
+
+    # Every n-gram that is not inside one run lies in these windows (the
+    # widest, n_max, windows hold the ones of every lower order too)
+    ref_windows = _local_windows([(r, r + length - n_max + 1) for r, _, length in token_runs],
+                                 ref_len, n_max)
+    hyp_windows = _local_windows([(h, h + length - n_max + 1) for _, h, length in token_runs],
+                                 hyp_len, n_max)
+    if 2 * sum(b - a for a, b in ref_windows + hyp_windows) > ref_len + hyp_len:
+        return sentence_bleu(before.split(), after.split())  # mostly changed: whole-file counting is cheaper
+
+    # Only the window tokens are split out of the texts; a sentinel after
+    # every window keeps n-grams from crossing window edges
+    ref_local, ref_window, ref_run = _window_tokens(
+        lambda a, b: _token_slice(before, old_starts, old_off, a, b),
+        ref_windows, [(r, length) for r, _, length in token_runs])
+    hyp_local, hyp_window, hyp_run = _window_tokens(
+        lambda a, b: _token_slice(after, new_starts, new_off, a, b),
+        hyp_windows, [(h, length) for _, h, length in token_runs])
+    local_tokens = ref_local + hyp_local
+    vocab = {t: i for i, t in enumerate(dict.fromkeys(local_tokens))}
+    joined = np.fromiter(map(vocab.__getitem__, local_tokens), dtype=np.int64, count=len(local_tokens))
+    window_left = np.concatenate([ref_window, hyp_window])
+    run_left = np.concatenate([ref_run, hyp_run])
+    split = len(ref_local)
+
+    numerators = np.zeros(n_max, dtype=np.int64)
+    denominators = np.ones(n_max, dtype=np.int64)
+    for n in range(1, n_max + 1):
+        denominators[n - 1] = max(1, hyp_len - n + 1)
+        # n-grams inside a shared run occur in both files and always match
+        numerators[n - 1] = sum(max(0, length - n + 1) for _, _, length in token_runs)
+    for n, codes in _ngram_codes(joined, n_max):
+        # The rest start at a window position with n tokens left in the
+        # window and fewer than n left in its run
+        local = (window_left[:len(codes)] >= n) & (run_left[:len(codes)] < n)
+        size = int(codes.max()) + 1
+        numerators[n - 1] += np.minimum(np.bincount(codes[:split][local[:split]], minlength=size),
+                                        np.bincount(codes[split:][local[split:]], minlength=size)).sum()
+    return bleu_from_counts(numerators, denominators, ref_len, hyp_len)
+
+
+def _bleu_pair(pair):
+    return compute_bleu(*pair)
+
+
+def bleu_scores(code_before, code_after, workers=None):
+    """BLEU for every row, spread over a process pool when there is more than one CPU"""
+    pairs = list(zip(code_before, code_after))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < 2:
+        return [compute_bleu(b, a) for b, a in pairs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_bleu_pair, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+
+def _read_text(path):
+    if isinstance(path, str) and os.path.exists(path):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return np.nan
+
+
+def load_texts(csv_path, columns=("Source Code Before", "Source Code After", "Diff")):
+    """
+    The requested text columns of a CSV: read from the content store for a
+    slim table (keys only), or from the files of its "... File Path" columns
+    """
+    df = pd.read_csv(csv_path)
+    if "Before Key" in df.columns:
+        df = attach_text(df, ContentStore(), columns)
+        return len(df), [df[c] for c in columns]
+    return len(df), [[_read_text(p) for p in df[f"{c} File Path"]] for c in columns]
+
+
+def check_parity(csv_path="commit_metrics.csv"):
+    from nltk.translate.bleu_score import sentence_bleu as nltk_bleu, SmoothingFunction
+    smooth_fn = SmoothingFunction().method1
+
+    def reference(code_before, code_after):
+        if pd.isna(code_before) or pd.isna(code_after):
+            return 0.0
+        ref_tokens = str(code_before).split()
+        hyp_tokens = str(code_after).split()
+        if len(ref_tokens) == 0 or len(hyp_tokens) == 0:
+            return 0.0
+        return nltk_bleu([ref_tokens], hyp_tokens, smoothing_function=smooth_fn)
+
+    rows, (before, after) = load_texts(csv_path, ("Source Code Before", "Source Code After"))
+
+    start = time.perf_counter()
+    expected = [reference(b, a) for b, a in zip(before, after)]
+    nltk_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = bleu_scores(before, after)
+    fast_time = time.perf_counter() - start
+
+    diff = np.abs(np.array(expected, dtype=float) - np.array(got, dtype=float))
+    print(f"Rows: {rows}")
+    print(f"NLTK: {nltk_time:.2f}s   fast: {fast_time:.2f}s   ({nltk_time / fast_time:.1f}x)")
+    print(f"Max abs difference: {diff.max():.3e}")
+    print("✓ Parity OK" if diff.max() <= 1e-9 else "✗ Parity FAILED")
+
+
+def _changed_share(before, after, diff_text):
+    """Share of the two texts' lines inside hunks; NaN when a side is empty or there is no diff"""
+    if pd.isna(before) or pd.isna(after) or pd.isna(diff_text) or \
+            not str(before).strip() or not str(after).strip():
+        return np.nan
+    hunk_lines = sum(int(old_len or 1) + int(new_len or 1)
+                     for _, old_len, _, new_len in _hunk_headers.findall(str(diff_text)))
+    return hunk_lines / max(1, str(before).count("\n") + str(after).count("\n"))
+
+
+def _row_times(func, *columns):
+    values, times = [], []
+    for args in zip(*columns):
+        start = time.perf_counter()
+        values.append(func(*args))
+        times.append(time.perf_counter() - start)
+    return np.array(values, dtype=float), np.array(times)
+
+
+def check_diff_equivalence(csv_path="commit_metrics.csv", repeat=3):
+    """diff_bleu vs whole-file BLEU on every row, timed by share of changed lines"""
+    rows, (before, after, diffs) = load_texts(csv_path)
+
+    # Best of `repeat` per row; every cold pass starts from an empty per-blob
+    # layout cache and the warm pass after it only reads the cache
+    full = cold = warm = np.inf
+    for _ in range(repeat):
+        expected, times = _row_times(compute_bleu, before, after)
+        full = np.minimum(full, times)
+        _blob_cache.clear()
+        cold = np.minimum(cold, _row_times(diff_bleu, before, after, diffs)[1])
+        got, times = _row_times(diff_bleu, before, after, diffs)
+        warm = np.minimum(warm, times)
+    worst = float(np.max(np.abs(expected - got), initial=0))
+
+    share = np.array([_changed_share(b, a, d) for b, a, d in zip(before, after, diffs)])
+    print(f"Rows: {rows}")
+    print(f"{'Changed lines':<16}{'Rows':>6}{'Whole s':>9}{'Cold s':>8}{'Warm s':>8}")
+    edges = [0, 0.02, 0.05, 0.1, 0.2, 0.5, np.inf]
+    buckets = [(f"{lo:.0%}-{hi:.0%}" if hi < np.inf else f">= {lo:.0%}", (share >= lo) & (share < hi))
+               for lo, hi in zip(edges, edges[1:])]
+    buckets += [("empty / no diff", np.isnan(share)), ("all", np.ones(len(share), bool))]
+    for label, rows_in in buckets:
+        print(f"{label:<16}{int(rows_in.sum()):>6}{full[rows_in].sum():>9.3f}"
+              f"{cold[rows_in].sum():>8.3f}{warm[rows_in].sum():>8.3f}")
+    print(f"Max abs difference: {worst:.3e}")
+    print("✓ Equivalent" if worst <= 1e-9 else "✗ Scores differ")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--check-diff"]:
+        check_diff_equivalence(args[1] if len(args) > 1 else "commit_metrics.csv")
+    else:
+        check_parity(args[0] if args else "commit_metrics.csv")
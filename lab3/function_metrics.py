@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Function-level incremental MI / CC, driven by the diff.
+
+A file version is cut into a table of segments: top-level statements, and
+for classes a header row plus one row per class-body member (method,
+attribute, docstring). Each segment keeps its line and byte range and the
+radon partial results it contributes to the file totals:
+
+- CC:  decision points and block complexities (cc_visit blocks)
+- Halstead: operator / operand *sets* and counts. The file volume needs the
+  number of distinct operators and operands over the whole module, which is
+  not a sum of per-function distinct counts - but it is the size of the
+  union of per-segment sets, so the sets are what gets stored.
+- raw: sloc, lloc, comment and multi-line-string lines
+
+For an after version, the segments of the before table that no diff hunk
+touches are shifted to their new lines and reused as-is; only the changed
+segments are parsed and visited again. File-level MI and CC are then folded
+from the segments and equal a full radon recompute (python
+function_metrics.py --check verifies this over lab2/commit_diffs.csv).
+
+Usage: python function_metrics.py --check [csv]
+"""
+
+import ast
+import copy
+import hashlib
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from radon.metrics import mi_compute
+from radon.raw import analyze
+from radon.visitors import Class, ComplexityVisitor, HalsteadVisitor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab2.diff_parser import ADDED, REMOVED, parse_diff  # noqa: E402
+
+from metrics import blob_hash, file_metrics  # noqa: E402
+
+lab2_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab2")
+
+# kind: "stmt" (top-level statements), "class" (class header), "member" (class body)
+Segment = namedtuple("Segment", ["name", "kind", "first_line", "last_line",
+                                 "start_byte", "end_byte", "digest", "stats"])
+SegmentStats = namedtuple("SegmentStats", ["complexity", "methods", "blocks",
+                                           "operators", "operands", "node_operands",
+                                           "n_operators", "n_operands",
+                                           "sloc", "lloc", "comments", "multi"])
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8", errors="replace")).digest()
+
+
+def _line_starts(text):
+    """Character offset of every line start (ast numbering: lines split on \\n)"""
+    starts = [0]
+    pos = text.find("\n")
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = text.find("\n", pos + 1)
+    if starts[-1] == len(text) and len(starts) > 1:
+        starts.pop()  # text ends with a newline: no extra empty line
+    return starts
+
+
+def _plain_lines(text):
+    """
+    Line starts, or None when the text has line breaks other than \n
+    (\r, \x0c, \x1c, ...): radon's raw counts split on those and ast
+    does not, so segments would not line up with the line numbers.
+    """
+    starts = _line_starts(text)
+    return starts if len(text.splitlines()) == (len(starts) if text else 0) else None
+
+
+def _halstead(node):
+    visitor = HalsteadVisitor.from_ast(node)
+    operands = [o for o in visitor.operands_seen if not isinstance(o[1], ast.AST)]
+    # Non-name operands (calls, subscripts, ...) are AST nodes, distinct by
+    # identity, so only their number matters
+    return (frozenset(visitor.operators_seen), frozenset(operands),
+            len(visitor.operands_seen) - len(operands), visitor.operators, visitor.operands)
+
+
+def _stmt_stats(stmts, text):
+    """Top-level statements: complexity without the module's base 1"""
+    module = ast.Module(body=stmts, type_ignores=[])
+    visitor = ComplexityVisitor.from_ast(module)
+    raw = analyze(text)
+    return SegmentStats(visitor.total_complexity - 1, 0, [b.complexity for b in visitor.blocks],
+                        *_halstead(module), raw.sloc, raw.lloc, raw.comments, raw.multi)
+
+
+def _class_header_stats(node, text):
+    """Decorators, bases and keywords; the class block itself is folded from its members"""
+    header = copy.copy(node)
+    header.body = []
+    raw = analyze(text)
+    return SegmentStats(0, 0, [], *_halstead(header), raw.sloc, raw.lloc, raw.comments, raw.multi)
+
+
+def _member_stats(stmts, classname, text):
+    """Class-body statements: their share of the class complexity, as radon adds it up"""
+    visitor = ComplexityVisitor(True, classname, off=False)
+    for child in stmts:
+        visitor.visit(child)
+    raw = analyze(text)
+    return SegmentStats(visitor.complexity + visitor.functions_complexity + len(visitor.functions),
+                        len(visitor.functions), [f.complexity for f in visitor.functions],
+                        *_halstead(ast.Module(body=stmts, type_ignores=[])),
+                        raw.sloc, raw.lloc, raw.comments, raw.multi)
+
+
+def _first_line(node):
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _group(stmts):
+    """Statements sharing a line (a = 1; b = 2) belong to one segment"""
+    groups = []
+    for stmt in stmts:
+        if groups and _first_line(stmt) <= groups[-1][-1].end_lineno:
+            groups[-1].append(stmt)
+        else:
+            groups.append([stmt])
+    return groups
+
+
+def _layout(stmts, line_offset=0, classname=None):
+    """
+    [(kind, name, first line, stmts or class node)] in file order. A class
+    whose body starts below its header line is split into header + members.
+    """
+    rows = []
+    for group in _group(stmts):
+        first = _first_line(group[0]) + line_offset
+        node = group[0]
+        if classname is not None:
+            rows.append(("member", f"{classname}.{getattr(node, 'name', '<body>')}", first, group))
+        elif (len(group) == 1 and isinstance(node, ast.ClassDef)
+              and _first_line(node.body[0]) > node.lineno):
+            rows.append(("class", node.name, first, node))
+            rows.extend(_layout(node.body, line_offset, node.name))
+        else:
+            rows.append(("stmt", getattr(node, "name", "<module>"), first, group))
+    return rows
+
+
+class FunctionTable:
+    """Segment table of one file version; segments cover every line, in order"""
+
+    def __init__(self, segments, n_lines):
+        self.segments = segments
+        self.n_lines = n_lines
+
+    @classmethod
+    def build(cls, text):
+        """Full parse; raises SyntaxError when the text is not Python"""
+        starts = _plain_lines(text)
+        if starts is None:
+            raise SyntaxError("line breaks other than \\n")
+        tree = ast.parse(text)
+        layout = _layout(tree.body)
+        if not layout:
+            layout = [("stmt", "<module>", 1, [])]
+        return cls(_segments(layout, text, starts, 1, len(starts)), len(starts))
+
+    # ---------------- Totals ---------------- #
+
+    def totals(self):
+        """(MI, CC) exactly as metrics.file_metrics computes them"""
+        complexity = 1
+        blocks = []
+        operators, operands = set(), set()
+        node_operands = n_operators = n_operands = 0
+        sloc = lloc = comments = 0
+
+        current_class = None  # [name, real complexity, methods, method blocks]
+        for seg in self.segments + [None]:
+            if current_class and (seg is None or seg.kind != "member"):
+                name, real, methods, method_blocks = current_class
+                blocks.append(Class(name, 0, 0, 0, [None] * methods, [], real).complexity)
+                blocks.extend(method_blocks)
+                current_class = None
+            if seg is None:
+                break
+            s = seg.stats
+            if seg.kind == "class":
+                current_class = [seg.name, 1, 0, []]
+            elif seg.kind == "member":
+                current_class[1] += s.complexity
+                current_class[2] += s.methods
+                current_class[3].extend(s.blocks)
+            else:
+                blocks.extend(s.blocks)
+            complexity += s.complexity
+            operators |= s.operators
+            operands |= s.operands
+            node_operands += s.node_operands
+            n_operators += s.n_operators
+            n_operands += s.n_operands
+            sloc += s.sloc
+            lloc += s.lloc
+            comments += s.comments + s.multi
+
+        # Halstead volume as radon.metrics.halstead_visitor_report computes it
+        h = len(operators) + len(operands) + node_operands
+        volume = (n_operators + n_operands) * math.log(h, 2) if h != 0 else 0
+        comment_pct = comments / float(sloc) * 100 if sloc != 0 else 0
+        mi = mi_compute(volume, complexity, lloc, comment_pct)
+        cc = float(np.mean(blocks)) if blocks else 0.0
+        return mi, cc
+
+    # ---------------- Incremental update ---------------- #
+
+    def update(self, new_text, diff_text):
+        """
+        Table of the after version, re-visiting only the segments the diff
+        touches. Returns (table, segments re-visited), or None when the diff
+        does not line up with this table - then build() the new text instead.
+        """
+        starts = _plain_lines(new_text)
+        if starts is None:
+            return None
+        n_new = len(starts) if new_text else 0
+        diff = parse_diff(diff_text)
+        removed, added = diff.lines(REMOVED), diff.lines(ADDED)
+        kept_old = np.setdiff1d(np.arange(1, self.n_lines + 1), removed)
+        kept_new = np.setdiff1d(np.arange(1, n_new + 1), added)
+        if len(kept_old) != len(kept_new) or not len(kept_old):
+            return None  # diff does not match, or the whole file was rewritten
+
+        firsts = np.array([s.first_line for s in self.segments])
+        dirty = np.zeros(len(self.segments), dtype=bool)
+        dirty[np.searchsorted(firsts, removed, side="right") - 1] = True
+        # An added line lands after the last kept line before it
+        anchors = np.searchsorted(kept_new, added)
+        after_old = np.where(anchors > 0, kept_old[np.maximum(anchors - 1, 0)], 1)
+        dirty[np.searchsorted(firsts, after_old, side="right") - 1] = True
+
+        # A changed class header re-parses the whole class; so does a dirty run
+        # that goes past the last member (the edit may have moved code out)
+        for i, seg in enumerate(self.segments):
+            if seg.kind == "class":
+                end = self._class_end(i)
+                if dirty[i] or (end < len(dirty) and dirty[end - 1] and dirty[end]):
+                    dirty[i:end] = True
+
+        old_to_new = np.zeros(self.n_lines + 2, dtype=np.int64)
+        old_to_new[kept_old] = kept_new
+        segments = []
+        revisited = 0
+        i = 0
+        while i < len(self.segments):
+            seg = self.segments[i]
+            if not dirty[i]:
+                first = int(old_to_new[seg.first_line])
+                last = first + seg.last_line - seg.first_line
+                start = starts[first - 1]
+                end = starts[last] if last < len(starts) else len(new_text)
+                if _digest(new_text[start:end]) != seg.digest:
+                    return None
+                segments.append(seg._replace(first_line=first, last_line=last))
+                i += 1
+                continue
+
+            j = i
+            while j < len(self.segments) and dirty[j]:
+                j += 1
+            first = segments[-1].last_line + 1 if segments else 1
+            last = int(old_to_new[self.segments[j].first_line]) - 1 if j < len(self.segments) else n_new
+            region = self._parse_region(new_text, starts, first, last, self.segments[i:j])
+            if region is None:
+                return None
+            segments.extend(region)
+            revisited += len(region)
+            i = j
+
+        if not segments:
+            return None
+        table = FunctionTable(_fix_bytes(segments, new_text, starts), n_new)
+        return table, revisited
+
+    def _class_end(self, i):
+        end = i + 1
+        while end < len(self.segments) and self.segments[end].kind == "member":
+            end += 1
+        return end
+
+    def _parse_region(self, new_text, starts, first, last, old_segments):
+        """Segments for new lines first..last, which replace old_segments"""
+        if last < first:
+            # Everything in the region was deleted; a class cannot lose all its members
+            if old_segments[0].kind == "member" and all(s.kind == "member" for s in old_segments):
+                return None
+            return []
+        start = starts[first - 1]
+        end = starts[last] if last < len(starts) else len(new_text)
+        text = new_text[start:end]
+
+        if old_segments[0].kind == "member":
+            classname = old_segments[0].name.split(".")[0]
+            # Parse class-body lines under a stub header (one line above them)
+            try:
+                tree = ast.parse(f"class {classname}:\n" + text)
+            except SyntaxError:
+                return None
+            if len(tree.body) != 1 or not isinstance(tree.body[0], ast.ClassDef):
+                return None  # the edit moved code out of the class
+            layout = _layout(tree.body[0].body, first - 2, classname)
+        else:
+            try:
+                tree = ast.parse(text)
+            except SyntaxError:
+                return None
+            layout = _layout(tree.body, first - 1)
+            if not layout:
+                layout = [("stmt", "<module>", first, [])]
+        return _segments(layout, new_text, starts, first, last)
+
+
+def _fix_bytes(segments, text, starts):
+    """Byte ranges from line numbers (UTF-8 offsets, cumulative over the file)"""
+    out = []
+    byte = 0
+    for seg in segments:
+        start = starts[seg.first_line - 1]
+        end = starts[seg.last_line] if seg.last_line < len(starts) else len(text)
+        size = len(text[start:end].encode("utf-8", errors="replace"))
+        out.append(seg._replace(start_byte=byte, end_byte=byte + size))
+        byte += size
+    return out
+
+
+def _segments(layout, text, starts, first_line, last_line):
+    """Visit each layout row over its line range (rows tile first_line..last_line)"""
+    segments = []
+    for k, (kind, name, first, payload) in enumerate(layout):
+        first = first_line if k == 0 else first
+        last = layout[k + 1][2] - 1 if k + 1 < len(layout) else last_line
+        start = starts[first - 1]
+        end = starts[last] if last < len(starts) else len(text)
+        seg_text = text[start:end]
+        if kind == "class":
+            stats = _class_header_stats(payload, seg_text)
+        elif kind == "member":
+            stats = _member_stats(payload, name.split(".")[0], seg_text)
+        else:
+            stats = _stmt_stats(payload, seg_text)
+        segments.append(Segment(name, kind, first, last, None, None, _digest(seg_text), stats))
+    return _fix_bytes(segments, text, starts)
+
+
+# ---------------- Per-row driver ---------------- #
+
+def table_metrics(text):
+    """(MI, CC, LOC, table) from a full parse; table is None for non-Python text"""
+    loc = len(text.splitlines())
+    try:
+        table = FunctionTable.build(text)
+    except (SyntaxError, ValueError):
+        mi, cc, loc = file_metrics(text)
+        return mi, cc, loc, None
+    mi, cc = table.totals()
+    return mi, cc, loc, table
+
+
+def incremental_metrics(before_table, after_text, diff_text):
+    """
+    (MI, CC, LOC, table, segments re-visited) of an after version. Falls back
+    to a full build when there is no usable before table or diff; then the
+    re-visited count is every segment of the new table.
+    """
+    loc = len(after_text.splitlines())
+    if before_table is not None and isinstance(diff_text, str):
+        updated = before_table.update(after_text, diff_text)
+        if updated is not None:
+            table, revisited = updated
+            mi, cc = table.totals()
+            return mi, cc, loc, table, revisited
+    mi, cc, loc, table = table_metrics(after_text)
+    return mi, cc, loc, table, len(table.segments) if table else 0
+
+
+def _incremental_job(job):
+    return incremental_metrics(*job)
+
+
+def _map(fn, jobs, workers):
+    if workers == 1:
+        return [fn(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, jobs, chunksize=8))
+
+
+def compute_incremental(before_texts, after_texts, diffs, cache, tables, workers=None):
+    """
+    Metrics stage on segment tables: (before, after) arrays of MI, CC, LOC.
+    Before versions get a full table (cached by blob hash); after versions
+    are updated from their before table and diff. cache and tables
+    ({blob hash: (MI, CC, LOC)} and {blob hash: FunctionTable}) are filled in.
+    Returns the arrays and the (re-visited, total) segment counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    before_keys = [None if pd.isna(t) else blob_hash(t) for t in before_texts]
+    after_keys = [None if pd.isna(t) else blob_hash(t) for t in after_texts]
+
+    todo = {}
+    for key, text in zip(before_keys, before_texts):
+        if key is not None and key not in tables:
+            todo.setdefault(key, text)
+    for key, (mi, cc, loc, table) in zip(todo, _map(table_metrics, todo.values(), workers)):
+        cache[key] = (mi, cc, loc)
+        tables[key] = table
+
+    todo = {}
+    for b_key, a_key, text, diff in zip(before_keys, after_keys, after_texts, diffs):
+        if a_key is not None and a_key not in tables:
+            todo.setdefault(a_key, (tables.get(b_key), text, diff if isinstance(diff, str) else None))
+    visited = total = 0
+    for key, (mi, cc, loc, table, revisited) in zip(todo, _map(_incremental_job, todo.values(), workers)):
+        cache[key] = (mi, cc, loc)
+        tables[key] = table
+        visited += revisited
+        total += len(table.segments) if table else 0
+
+    def lookup(keys):
+        out = np.full((len(keys), 3), np.nan)
+        for i, key in enumerate(keys):
+            if key is not None:
+                out[i] = cache[key]
+        return out
+
+    return lookup(before_keys), lookup(after_keys), (visited, total)
+
+
+# ---------------- Equivalence check ---------------- #
+
+def _read(relative_path):
+    path = os.path.join(lab2_dir, str(relative_path))
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _same(a, b):
+    return (np.isnan(a) and np.isnan(b)) or a == b
+
+
+def check_equivalence(csv_path=os.path.join(lab2_dir, "commit_diffs.csv")):
+    """Incremental vs full radon recompute on every modified .py file"""
+    df = pd.read_csv(csv_path)
+    df = df[df["File Name"].str.endswith(".py")]
+    rows = mismatches = incremental = 0
+    visited = total_segments = 0
+    full_time = inc_time = 0.0
+    for row in df.to_dict("records"):
+        before = _read(row["Source Code Before File Path"])
+        after = _read(row["Source Code After File Path"])
+        diff = _read(row["Diff File Path"])
+        if not before or not after or diff is None:
+            continue
+        rows += 1
+        _, _, _, before_table = table_metrics(before)
+
+        start = time.perf_counter()
+        expected = file_metrics(after)
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        mi, cc, loc, table, revisited = incremental_metrics(before_table, after, diff)
+        inc_time += time.perf_counter() - start
+
+        if before_table is not None and table is not None and revisited < len(table.segments):
+            incremental += 1
+        if table is not None:
+            visited += revisited
+            total_segments += len(table.segments)
+        if not all(_same(x, y) for x, y in zip((mi, cc, loc), expected)):
+            mismatches += 1
+            print(f"  mismatch: {row['Commit Hash'][:10]} {row['File Name']}: "
+                  f"{(mi, cc, loc)} vs {expected}")
+
+    print(f"Rows checked: {rows}, mismatches: {mismatches}")
+    print(f"Served incrementally: {incremental}/{rows} "
+          f"({visited}/{total_segments} segments re-visited)")
+    print(f"Full radon recompute: {full_time:.2f}s   incremental: {inc_time:.2f}s")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        sys.exit(0 if check_equivalence(*sys.argv[2:3]) else 1)
+    print(__doc__)
@@ -1,49 +1,169 @@
 import os
-import pandas as pd
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
-LAB2_DIR = os.path.join(os.path.dirname(__file__), '..', 'Lab2')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lab_datasets import dataset_path, load  # noqa: E402
+
+LAB2_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lab2')
 CODES_DIR = os.path.join(LAB2_DIR, 'codes')
+DIFFS_DIR = os.path.join(LAB2_DIR, 'diffs')
+
+CACHE_BYTES = 256 * 1024 * 1024  # file contents kept in memory across calls
 
 # Load commit-level dataset
 def load_commit_dataset():
-    path = os.path.join(LAB2_DIR, 'bug_fixing_commits.csv')
+    path = dataset_path('bug_fixing_commits')
     print(f"📂 Loading commit dataset: {path}")
     if not os.path.exists(path):
         print("❌ File not found!")
-    return pd.read_csv(path)
+    return load('bug_fixing_commits')
 
 # Load file-level dataset
 def load_file_dataset():
-    path = os.path.join(LAB2_DIR, 'commit_predictions.csv')
+    path = dataset_path('commit_predictions')
     print(f"📂 Loading file dataset: {path}")
     if not os.path.exists(path):
         print("❌ File not found!")
-    return pd.read_csv(path)
-
-def get_code_pair(commit_hash, filename):
-    base = os.path.basename(filename)
-    before_path = os.path.join(CODES_DIR, f"{commit_hash}_{base}_before.txt")
-    after_path  = os.path.join(CODES_DIR, f"{commit_hash}_{base}_after.txt")
-
+    return load('commit_predictions')
+
+
+# LRU cache of file contents, bounded by the bytes read from disk
+class ByteLRUCache:
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path -> (text or None if missing, bytes)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def read(self, path):
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return self._entries[path][0]
+            self.misses += 1
+
+        # Disk read outside the lock so pool threads overlap their I/O
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Universal newlines, as open(path, encoding='utf-8') reads it
+            text = data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+            nbytes = len(data)
+        except FileNotFoundError:
+            text, nbytes = None, 0
+
+        with self._lock:
+            if path not in self._entries:
+                self._entries[path] = (text, nbytes)
+                self.size += nbytes
+                while self.size > self.max_bytes and len(self._entries) > 1:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.size -= evicted
+        return text
+
+
+_cache = ByteLRUCache()
+
+
+def resolve_code_path(path):
+    """
+    Code paths as stored in the CSV's "Source Code Before/After File Path"
+    columns, relative to lab2 ("codes/...") or to lab2/codes. File names are
+    not rebuilt from the commit and "File Name": diffs_gen.py names the files
+    after the full path in the repository, which "File Name" does not hold.
+    """
+    if os.path.isabs(path):
+        return path
+    if path.startswith('codes' + os.sep) or path.startswith('codes/'):
+        return os.path.join(LAB2_DIR, path)
+    return os.path.join(CODES_DIR, path)
+
+
+def resolve_diff_path(path):
+    """Diff paths are stored relative to lab2 ("diffs/...") or to lab2/diffs"""
+    if os.path.isabs(path):
+        return path
+    if path.startswith('diffs' + os.sep) or path.startswith('diffs/'):
+        return os.path.join(LAB2_DIR, path)
+    return os.path.join(DIFFS_DIR, path)
+
+
+def _code_pair(before_text, after_text, counts):
+    # BEFORE only counts when it has content; AFTER is kept as-is
     code_before = None
-    code_after = None
-
-    # Load BEFORE file only if it has content
-    if os.path.exists(before_path):
-        with open(before_path, encoding='utf-8') as f:
-            content = f.read().strip()
-            if content:
-                code_before = content
-                print(f"✅ Loaded BEFORE file: {before_path} ({len(code_before.splitlines())} lines)")
-            else:
-                print(f"⚠️ BEFORE file empty → skipping: {before_path}")
+    if before_text is None:
+        counts['before_missing'] += 1
+    elif before_text.strip():
+        code_before = before_text.strip()
+    else:
+        counts['before_empty'] += 1
+    if after_text is None:
+        counts['after_missing'] += 1
+    return code_before, after_text
+
+
+def _prefetched(paths_per_item, workers, prefetch, cache):
+    """Contents of each item's paths, in order, read up to `prefetch` items ahead"""
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for paths in paths_per_item:
+            pending.append([pool.submit(cache.read, p) for p in paths])
+            if len(pending) >= prefetch:
+                yield [f.result() for f in pending.popleft()]
+        while pending:
+            yield [f.result() for f in pending.popleft()]
+
+
+def get_code_pairs(items, workers=8, prefetch=256, cache=_cache, verbose=True):
+    """
+    (code_before, code_after) for every (before path, after path) in items,
+    in order - same values as get_code_pair, read on a thread pool through
+    the shared cache. Missing / empty files are counted and reported once.
+    """
+    counts = Counter()
+    paths = ((resolve_code_path(before), resolve_code_path(after)) for before, after in items)
+    for before_text, after_text in _prefetched(paths, workers, prefetch, cache):
+        counts['pairs'] += 1
+        yield _code_pair(before_text, after_text, counts)
+    if verbose:
+        print(f"📂 Loaded {counts['pairs']} code pairs: {counts['before_missing']} BEFORE missing, "
+              f"{counts['before_empty']} BEFORE empty, {counts['after_missing']} AFTER missing "
+              f"(cache: {cache.hits} hits, {cache.size / 1e6:.1f} MB)")
+
+
+def get_diffs(diff_paths, workers=8, prefetch=256, cache=_cache, verbose=True):
+    """Contents of many diff files (None if missing), in order, through the same cache"""
+    counts = Counter()
+    paths = ([resolve_diff_path(p)] for p in diff_paths)
+    for (diff,) in _prefetched(paths, workers, prefetch, cache):
+        counts['diffs'] += 1
+        counts['missing'] += diff is None
+        yield diff
+    if verbose:
+        print(f"📂 Loaded {counts['diffs']} diffs: {counts['missing']} missing")
+
+
+def get_code_pair(before_path, after_path):
+    before_path, after_path = resolve_code_path(before_path), resolve_code_path(after_path)
+    code_before, code_after = _code_pair(_cache.read(before_path), _cache.read(after_path), Counter())
+
+    if code_before is not None:
+        print(f"✅ Loaded BEFORE file: {before_path} ({len(code_before.splitlines())} lines)")
+    elif os.path.exists(before_path):
+        print(f"⚠️ BEFORE file empty → skipping: {before_path}")
     else:
         print(f"⚠️ BEFORE file missing: {before_path}")
 
-    # Load AFTER file (always if exists)
-    if os.path.exists(after_path):
-        with open(after_path, encoding='utf-8') as f:
-            code_after = f.read()
+    if code_after is not None:
         print(f"✅ Loaded AFTER file: {after_path} ({len(code_after.splitlines())} lines)")
     else:
         print(f"⚠️ AFTER file missing: {after_path}")
@@ -53,15 +173,9 @@ def get_code_pair(commit_hash, filename):
 
 # Utility to read a diff file
 def get_diff_content(diff_path):
-    if not os.path.isabs(diff_path):
-        base_dir = os.path.join(os.path.dirname(__file__), '..', 'Lab2', 'diffs')
-        full_path = os.path.join(base_dir, diff_path)
-    else:
-        full_path = diff_path
-
-    if os.path.exists(full_path):
-        with open(full_path, encoding='utf-8') as f:
-            diff = f.read()
+    full_path = resolve_diff_path(diff_path)
+    diff = _cache.read(full_path)
+    if diff is not None:
         print(f"✅ Loaded DIFF file: {full_path} ({len(diff.splitlines())} lines)")
         return diff
     else:
@@ -80,10 +194,16 @@ if __name__ == "__main__":
     filename = file_df.iloc[0]["File Name"]
 
     print(f"➡️ Trying to load code pair for: {filename} (hash: {commit_hash})")
-    code_before, code_after = get_code_pair(commit_hash, filename)
+    code_before, code_after = get_code_pair(file_df.iloc[0]["Source Code Before File Path"],
+                                            file_df.iloc[0]["Source Code After File Path"])
 
     print("\n--- Code Before (first 200 chars) ---")
     print(code_before[:200] if code_before else "❌ No BEFORE code loaded")
 
     print("\n--- Code After (first 200 chars) ---")
     print(code_after[:200] if code_after else "❌ No AFTER code loaded")
+
+    # Batched loading of every pair and diff
+    pairs = list(get_code_pairs(zip(file_df["Source Code Before File Path"],
+                                    file_df["Source Code After File Path"])))
+    diffs = list(get_diffs(file_df["Diff File Path"]))
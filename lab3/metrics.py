@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Structural metrics stage: maintainability index, cyclomatic complexity and
+LOC for every before / after file, written next to the commit rows.
+
+- MI:  radon mi_visit (multi-line strings counted as comments)
+- CC:  mean radon cc_visit complexity over all blocks, 0 when there are none
+- LOC: number of lines
+
+MI and CC are NaN when the text does not parse as Python. Results are
+cached by git blob hash, so a file version shared by many rows (or seen in
+an earlier run) is analysed once; the rest run in a process pool.
+
+With --incremental, every file becomes a per-function segment table
+(function_metrics.py) and an after version only re-visits the segments its
+diff touches; the totals are the same as the full recompute.
+
+Usage: python metrics.py [--incremental] [workers]
+"""
+
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import radon
+from radon.complexity import cc_visit
+from radon.metrics import mi_visit
+
+from content_store import ContentStore, blob_hash, split_table
+from score_store import ScoreStore, pair_keys
+
+input_file = "commit_analysis.csv"
+output_file = "commit_metrics.csv"  # slim: text lives in the content store
+cache_file = "metrics_cache.pkl"
+tables_file = "function_tables.pkl"
+
+METRICS_VERSION = f"radon-{radon.__version__}"  # score version in the score store
+
+METRIC_COLUMNS = ["MI_Before", "MI_After", "CC_Before", "CC_After", "LOC_Before", "LOC_After",
+                  "MI_Change", "CC_Change", "LOC_Change"]
+
+
+# ---------------- Pool worker ---------------- #
+
+def file_metrics(text):
+    """(MI, CC, LOC) of one file version"""
+    loc = len(text.splitlines())
+    try:
+        mi = mi_visit(text, True)
+        blocks = cc_visit(text)
+    except Exception:  # not Python (or not valid Python): only LOC applies
+        return np.nan, np.nan, loc
+    cc = float(np.mean([b.complexity for b in blocks])) if blocks else 0.0
+    return mi, cc, loc
+
+
+# ---------------- Metrics cache ---------------- #
+
+def load_cache(path=cache_file):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return {}
+
+
+def save_cache(cache, path=cache_file):
+    with open(path, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def compute_metrics(texts, cache, workers=None):
+    """
+    (n, 3) array of MI, CC, LOC for texts (NaN rows for missing code).
+    Every distinct blob not in the cache is analysed once, in parallel.
+    """
+    keys = [None if pd.isna(t) else blob_hash(t) for t in texts]
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key is not None and key not in cache:
+            missing.setdefault(key, text)
+
+    if missing:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            results = [file_metrics(t) for t in missing.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(file_metrics, missing.values(), chunksize=8))
+        cache.update(zip(missing, results))
+
+    out = np.full((len(texts), 3), np.nan)
+    for i, key in enumerate(keys):
+        if key is not None:
+            out[i] = cache[key]
+    return out, len(missing)
+
+
+def add_metric_columns(df, before, after):
+    """before / after: (n, 3) MI, CC, LOC arrays; columns in METRIC_COLUMNS order"""
+    for j, metric in enumerate(("MI", "CC", "LOC")):
+        df[f"{metric}_Before"] = before[:, j]
+        df[f"{metric}_After"] = after[:, j]
+    for metric in ("MI", "CC", "LOC"):
+        df[f"{metric}_Change"] = df[f"{metric}_After"] - df[f"{metric}_Before"]
+    return df
+
+
+def main(workers=None, incremental=False):
+    print(f"Loading dataset: {input_file}")
+    df = pd.read_csv(input_file)
+    df = df.drop(columns=[c for c in METRIC_COLUMNS if c in df.columns])
+
+    cache = load_cache()
+    start = time.perf_counter()
+    if incremental:
+        from function_metrics import compute_incremental  # imports this module
+
+        tables = load_cache(tables_file)
+        before, after, (visited, total) = compute_incremental(
+            df["Source Code Before"], df["Source Code After"], df["Diff"], cache, tables, workers)
+        save_cache(tables, tables_file)
+        print(f"✓ Segment tables updated in {time.perf_counter() - start:.2f}s "
+              f"({visited}/{total} segments of new after versions re-visited)")
+    else:
+        texts = list(df["Source Code Before"]) + list(df["Source Code After"])
+        results, analysed = compute_metrics(texts, cache, workers)
+        before, after = results[:len(df)], results[len(df):]
+        print(f"✓ Metrics for {len(texts)} file versions in {time.perf_counter() - start:.2f}s "
+              f"({analysed} analysed, {len(texts) - analysed} from cache or missing)")
+    save_cache(cache)
+
+    add_metric_columns(df, before, after)
+    store = ContentStore()
+    slim = split_table(df, store)
+    slim.to_csv(output_file, index=False)
+    store.save()
+    scores = ScoreStore()
+    for metric in METRIC_COLUMNS:
+        scores.put(metric, METRICS_VERSION, *pair_keys(slim), slim[metric])
+    print(f"Saved dataset with metrics to {output_file}")
+    print(df[METRIC_COLUMNS].describe().round(2).to_string())
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--incremental"]
+    main(int(args[0]) if args else None, incremental="--incremental" in sys.argv[1:])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Loads CodeBERT for the embedding engine: offline, lazily, on a chosen backend.
+
+The first load of a hub model saves its tokenizer and safetensors weights
+under model_cache/; after that every load is local (no hub round trip) and
+the weights are memory-mapped from the safetensors file instead of read and
+unpickled. torch / transformers are imported on the first load, so a run
+whose scores all come from the score store never pays for them.
+
+Backends (each is its own model version in the embedding / score stores):
+- fp32   the PyTorch model as published
+- int8   dynamic int8 quantization of every Linear layer (weights int8,
+         activations quantized on the fly) - smaller and faster on CPU
+- onnx   the fp32 graph exported once to model_cache/.../model.onnx and run
+         by ONNX Runtime; needs the optional onnx + onnxruntime packages
+         (checked with onnx 1.23.2, onnxruntime 1.31.0)
+
+Usage: python model_loader.py [--model NAME] [--rows N] [backend ...]
+       - cosine-score parity of the backends (default: int8) against fp32,
+         with load time and per-row cost
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = "microsoft/codebert-base"
+BACKENDS = ("fp32", "int8", "onnx")
+
+model_cache = "model_cache"
+parity_file = "commit_metrics.csv"
+
+
+def model_version(model_name=MODEL_NAME, backend="fp32"):
+    """Version string of a model's scores; fp32 keeps the plain model name"""
+    return model_name if backend == "fp32" else f"{model_name}+{backend}"
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (known: {', '.join(BACKENDS)})")
+
+
+def local_path(model_name=MODEL_NAME, cache_dir=model_cache):
+    """Local copy of a model, fetched from the hub the first time; local directories are used as is"""
+    if os.path.isdir(model_name):
+        return model_name
+    path = os.path.join(cache_dir, model_name.replace("/", "--"))
+    if not os.path.exists(os.path.join(path, "model.safetensors")):
+        from transformers import AutoModel, AutoTokenizer
+        print(f"📂 Fetching {model_name} into {path}")
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(path)
+        AutoModel.from_pretrained(model_name).save_pretrained(path, safe_serialization=True)
+    return path
+
+
+def load_tokenizer(model_name=MODEL_NAME, cache_dir=model_cache):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(local_path(model_name, cache_dir), local_files_only=True)
+
+
+def load_model(model_name=MODEL_NAME, backend="fp32", cache_dir=model_cache):
+    """Model in eval mode; called with input_ids / attention_mask it returns .last_hidden_state"""
+    check_backend(backend)
+    path = local_path(model_name, cache_dir)
+    if backend == "onnx":
+        return OnnxEncoder(path)
+
+    import torch
+    from transformers import AutoModel
+    model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+class OnnxEncoder:
+    """ONNX Runtime session behind the same call signature as the PyTorch model"""
+
+    def __init__(self, path):
+        try:
+            import onnxruntime
+        except ImportError as missing:
+            raise ImportError("The onnx backend needs onnxruntime (and onnx for the first export): "
+                              "pip install onnx==1.23.2 onnxruntime==1.31.0") from missing
+        from transformers import AutoConfig
+        self.config = AutoConfig.from_pretrained(path, local_files_only=True)
+        onnx_path = os.path.join(path, "model.onnx")
+        if not os.path.exists(onnx_path):
+            export_onnx(path, onnx_path)
+        self.session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask):
+        import torch
+        states, = self.session.run(["last_hidden_state"], {"input_ids": input_ids.numpy(),
+                                                           "attention_mask": attention_mask.numpy()})
+        return SimpleNamespace(last_hidden_state=torch.from_numpy(states))
+
+
+def export_onnx(path, onnx_path):
+    import torch
+    from transformers import AutoModel
+
+    class LastHidden(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+    ids = torch.ones((2, 8), dtype=torch.long)
+    axes = {0: "batch", 1: "tokens"}
+    print(f"📂 Exporting {path} to {onnx_path}")
+    torch.onnx.export(LastHidden(model), (ids, torch.ones_like(ids)), onnx_path,
+                      input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+                      dynamic_axes={"input_ids": axes, "attention_mask": axes, "last_hidden_state": axes},
+                      dynamo=False)
+
+
+# ---------------- Parity check ---------------- #
+
+def main(backends=("int8",), model_name=MODEL_NAME, rows=None):
+    from content_store import ContentStore, attach_text
+    from embedding_engine import EmbeddingEngine
+    from similarity import SEM_THRESHOLD, compute_semantic_similarities
+
+    df = attach_text(pd.read_csv(parity_file, nrows=rows), ContentStore(),
+                     ["Source Code Before", "Source Code After"])
+    before, after = df["Source Code Before"], df["Source Code After"]
+    print(f"Scoring {len(df)} rows of {parity_file} with {model_name}")
+
+    print(f"{'Backend':<8}{'Load s':>8}{'ms/row':>8}{'max |Δ|':>10}{'mean |Δ|':>10}{'Same class':>12}")
+    reference = None
+    for backend in ("fp32",) + tuple(b for b in backends if b != "fp32"):
+        engine = EmbeddingEngine(model_name, backend=backend)
+        start = time.perf_counter()
+        try:
+            engine.tokenizer, engine.model
+        except ImportError as missing:
+            if reference is None:
+                raise  # nothing to compare against without fp32
+            print(f"⚠️ {backend}: {missing}")
+            continue
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = compute_semantic_similarities(engine, before, after)
+        row_ms = (time.perf_counter() - start) * 1e3 / max(len(df), 1)
+        if reference is None:
+            reference = scores
+        delta = np.abs(scores - reference)
+        same = np.mean((scores >= SEM_THRESHOLD) == (reference >= SEM_THRESHOLD))
+        print(f"{backend:<8}{load_time:>8.2f}{row_ms:>8.1f}{delta.max():>10.4f}{delta.mean():>10.4f}{same:>12.1%}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--model", "--rows"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    main(tuple(args) or ("int8",), options.get("--model", MODEL_NAME),
+         int(options["--rows"]) if "--rows" in options else None)
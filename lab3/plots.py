@@ -2,9 +2,15 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load merged dataset
-df = pd.read_csv("commit_with_similarity.csv")  
-# (make sure this file has MI, CC, LOC, Semantic_Similarity, Token_Similarity, and classifications)
+from score_store import ScoreStore, attach_scores
+
+# Rows: only the label / class columns the plots use, plus the pair keys
+df = pd.read_csv("commit_similarity.csv",
+                 usecols=["File Name", "LLM Inference (fix type)", "Before Key", "After Key",
+                          "Semantic_Class", "Token_Class"])
+# Scores: only the metrics plotted below, read from the score store
+df = attach_scores(df, ScoreStore(), [f"{m}_{s}" for m in ("MI", "CC", "LOC") for s in ("Before", "After", "Change")]
+                   + ["Semantic_Similarity", "Token_Similarity"])
 
 # === Part (b): Descriptive Stats ===
 plt.figure()
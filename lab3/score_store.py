@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Columnar store of the per-pair scores: (before key, after key, metric,
+model version) -> value.
+
+Keys are the content-store blob hashes of the before / after text, so a
+score belongs to the code pair, not to a row or a run. score_store/
+scores.parquet has one row per pair and one column per "metric@version":
+- a new metric (or a new model version of one) is a new column; the
+  columns already stored are carried over, never recomputed
+- a reader loads only the key columns and the metric columns it asks for
+versions.json records the version last written for every metric, which is
+what readers get unless they ask for another one.
+
+Usage: python score_store.py    - import the scores of commit_similarity.csv
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+store_dir = "score_store"
+
+KEY_COLUMNS = ["Before Key", "After Key"]
+
+
+def pair_keys(df):
+    """(before keys, after keys) of df's rows; a missing side is the empty key"""
+    return ([k if isinstance(k, str) else "" for k in df[KEY_COLUMNS[0]]],
+            [k if isinstance(k, str) else "" for k in df[KEY_COLUMNS[1]]])
+
+
+def score_column(metric, version):
+    return f"{metric}@{version}"
+
+
+class ScoreStore:
+    """
+    A null cell is a score never computed; NaN is a computed score that is
+    undefined (e.g. the structural score of a non-Python file).
+    """
+
+    def __init__(self, directory=store_dir):
+        self.directory = directory
+        self.table_path = os.path.join(directory, "scores.parquet")
+        self.versions_path = os.path.join(directory, "versions.json")
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.versions_path):
+            with open(self.versions_path, encoding="utf-8") as f:
+                self.versions = json.load(f)  # metric -> current version
+        else:
+            self.versions = {}
+
+    def columns(self):
+        """Score columns stored so far"""
+        if not os.path.exists(self.table_path):
+            return []
+        return [c for c in pq.read_schema(self.table_path).names if c not in KEY_COLUMNS]
+
+    def _load(self, columns=None):
+        """(pair -> row, {column: (values, computed)}) for `columns` (all when None)"""
+        if not os.path.exists(self.table_path):
+            return {}, {}
+        stored = self.columns()
+        wanted = stored if columns is None else [c for c in columns if c in stored]
+        table = pq.read_table(self.table_path, columns=KEY_COLUMNS + wanted)
+        rows = {pair: i for i, pair in enumerate(zip(table["Before Key"].to_pylist(),
+                                                     table["After Key"].to_pylist()))}
+        scores = {}
+        for column in wanted:
+            chunked = table[column]
+            computed = chunked.is_valid().to_numpy(zero_copy_only=False)
+            values = chunked.fill_null(np.nan).to_numpy(zero_copy_only=False).astype(float)
+            scores[column] = (values, computed)
+        return rows, scores
+
+    def get(self, metric, version, before_keys, after_keys):
+        """(values, found) of one metric version for the given pairs; NaN where not found"""
+        column = score_column(metric, version)
+        rows, scores = self._load([column])
+        values = np.full(len(before_keys), np.nan)
+        found = np.zeros(len(before_keys), bool)
+        if column not in scores:
+            return values, found
+        stored, computed = scores[column]
+        positions = np.array([rows.get(pair, -1) for pair in zip(before_keys, after_keys)], np.int64)
+        hit = positions >= 0
+        found[hit] = computed[positions[hit]]
+        values[found] = stored[positions[found]]
+        return values, found
+
+    def put(self, metric, version, before_keys, after_keys, values):
+        """Add / replace the scores of some pairs and make `version` the current one"""
+        rows, scores = self._load()
+        for pair in zip(before_keys, after_keys):
+            rows.setdefault(pair, len(rows))
+        n = len(rows)
+        for column, (stored, computed) in scores.items():  # room for the new pairs
+            scores[column] = (np.concatenate([stored, np.full(n - len(stored), np.nan)]),
+                              np.concatenate([computed, np.zeros(n - len(computed), bool)]))
+
+        column = score_column(metric, version)
+        stored, computed = scores.get(column, (np.full(n, np.nan), np.zeros(n, bool)))
+        positions = [rows[pair] for pair in zip(before_keys, after_keys)]
+        stored[positions] = np.asarray(values, float)
+        computed[positions] = True
+        scores[column] = (stored, computed)
+
+        pairs = sorted(rows, key=rows.get)
+        arrays = {"Before Key": pa.array([b for b, _ in pairs], pa.string()),
+                  "After Key": pa.array([a for _, a in pairs], pa.string())}
+        for name, (stored, computed) in scores.items():
+            arrays[name] = pa.array(stored, pa.float64(), mask=~computed)
+        pq.write_table(pa.table(arrays), self.table_path)
+        self.versions[metric] = version
+        self.save()
+
+    def save(self):
+        with open(self.versions_path, "w", encoding="utf-8") as f:
+            json.dump(self.versions, f, indent=2, sort_keys=True)
+
+
+def attach_scores(df, store, metrics, versions=None):
+    """df with the stored scores of its pairs as columns, row order kept; one read for all metrics"""
+    versions = versions or {}
+    columns = {}
+    for metric in metrics:
+        version = versions.get(metric, store.versions.get(metric))
+        if version is None:
+            raise KeyError(f"No scores stored for {metric}")
+        columns[metric] = score_column(metric, version)
+
+    rows, scores = store._load(list(columns.values()))
+    positions = np.array([rows.get(pair, -1) for pair in zip(*pair_keys(df))], np.int64)
+    hit = positions >= 0
+    df = df.copy()
+    for metric, column in columns.items():
+        values = np.full(len(df), np.nan)
+        if column in scores:
+            values[hit] = scores[column][0][positions[hit]]
+        df[metric] = values
+    return df
+
+
+def cached_scores(store, metric, version, df, compute):
+    """
+    Scores of df's pairs; compute(rows) is called only for the row positions
+    whose pair has no stored score for this version, and its results are stored.
+    """
+    before, after = pair_keys(df)
+    values, found = store.get(metric, version, before, after)
+    rows = np.flatnonzero(~found)
+    if len(rows):
+        values[rows] = compute(rows)
+        store.put(metric, version, [before[i] for i in rows], [after[i] for i in rows], values[rows])
+    print(f"✓ {metric} ({version}): {len(rows)} computed, {int(found.sum())} from {store.directory}")
+    return values
+
+
+def main():
+    # Versions of the scores already in commit_similarity.csv
+    from embedding_engine import MODEL_NAME
+    from fast_bleu import BLEU_VERSION
+    from metrics import METRIC_COLUMNS, METRICS_VERSION
+    from similarity import output_file
+    from structural_similarity import STRUCTURAL_VERSION, python_rows
+
+    versions = {metric: METRICS_VERSION for metric in METRIC_COLUMNS}
+    versions.update({"Semantic_Similarity": MODEL_NAME, "Token_Similarity": BLEU_VERSION,
+                     "Structural_Similarity": STRUCTURAL_VERSION})
+
+    df = pd.read_csv(output_file)
+    store = ScoreStore()
+    for metric, version in versions.items():
+        if metric not in df.columns:
+            print(f"⚠️ {metric} not in {output_file}, skipping")
+            continue
+        # The structural score also depends on the file name: only .py rows are stored
+        rows = df.iloc[python_rows(df["File Name"])] if metric == "Structural_Similarity" else df
+        before, after = pair_keys(rows)
+        store.put(metric, version, before, after, rows[metric])
+        stored, _ = store.get(metric, version, before, after)
+        assert np.allclose(stored, rows[metric], equal_nan=True), f"{metric} does not round-trip"
+    print(f"✓ {len(versions)} metrics for {len(set(zip(*pair_keys(df))))} pairs -> {store_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,183 @@
+import sys
+
+import numpy as np
 import pandas as pd
-import torch
-from transformers import AutoTokenizer, AutoModel
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-
-# Load dataset
-print("Loading dataset: commit_with_metrics.csv")
-df = pd.read_csv("commit_with_metrics.csv")
-
-# Load CodeBERT model for semantic similarity
-print("Loading CodeBERT model...")
-tokenizer = AutoTokenizer.from_pretrained("microsoft/codebert-base")
-model = AutoModel.from_pretrained("microsoft/codebert-base")
-
-def get_codebert_embedding(text):
-    """Convert source code into embedding vector using CodeBERT"""
-    if pd.isna(text) or str(text).strip() == "":
-        return torch.zeros(768)  # empty vector for missing code
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        embeddings = outputs.last_hidden_state.mean(dim=1).squeeze()
-    return embeddings
-
-def cosine_similarity(vec1, vec2):
-    """Cosine similarity between two torch vectors"""
-    if vec1.norm().item() == 0 or vec2.norm().item() == 0:
-        return 0.0
-    return torch.nn.functional.cosine_similarity(vec1.unsqueeze(0), vec2.unsqueeze(0)).item()
-
-def compute_semantic_similarity(code_before, code_after):
-    emb1 = get_codebert_embedding(str(code_before))
-    emb2 = get_codebert_embedding(str(code_after))
-    return cosine_similarity(emb1, emb2)
-
-# BLEU for token similarity
-smooth_fn = SmoothingFunction().method1
-
-def compute_bleu(code_before, code_after):
-    if pd.isna(code_before) or pd.isna(code_after):
-        return 0.0
-    ref_tokens = str(code_before).split()
-    hyp_tokens = str(code_after).split()
-    if len(ref_tokens) == 0 or len(hyp_tokens) == 0:
-        return 0.0
-    return sentence_bleu([ref_tokens], hyp_tokens, smoothing_function=smooth_fn)
-
-print("Computing Semantic & Token similarities... (this may take time)")
-
-semantic_scores = []
-token_scores = []
-
-for idx, row in df.iterrows():
-    sem_sim = compute_semantic_similarity(row["Source Code Before"], row["Source Code After"])
-    tok_sim = compute_bleu(row["Source Code Before"], row["Source Code After"])
-    semantic_scores.append(sem_sim)
-    token_scores.append(tok_sim)
-
-df["Semantic_Similarity"] = semantic_scores
-df["Token_Similarity"] = token_scores
+import matplotlib.pyplot as plt
+
+from embedding_engine import EmbeddingEngine, MODEL_NAME, cosine_similarity_rows
+from model_loader import model_version
+from embedding_store import EmbeddingStore
+from chunked_embeddings import ChunkedEmbedder
+from fast_bleu import BLEU_VERSION, bleu_scores, diff_bleu
+from structural_similarity import cached_structural, classify_structural
+from structural_similarity import print_report as print_structural_report
+from content_store import ContentStore, attach_text, drop_text
+from score_store import ScoreStore, cached_scores
+
+input_file = "commit_metrics.csv"
+output_file = "commit_similarity.csv"  # slim: text lives in the content store
+scores_file = "similarity_scores.csv"  # slim score table for threshold_sweep.py
+embedding_cache = "embedding_cache"
 
 # Classification thresholds
 SEM_THRESHOLD = 0.8
 TOK_THRESHOLD = 0.75
 
-df["Semantic_Class"] = df["Semantic_Similarity"].apply(lambda x: "Minor Fix" if x >= SEM_THRESHOLD else "Major Fix")
-df["Token_Class"] = df["Token_Similarity"].apply(lambda x: "Minor Fix" if x >= TOK_THRESHOLD else "Major Fix")
-
-# Save with metrics
-output_file = "commit_with_similarity.csv"
-df.to_csv(output_file, index=False)
-print(f"Saved results with similarity metrics to {output_file}")
-
-print("\n Similarity & Classification Report")
-print("-" * 50)
-
-# Semantic classification stats
-sem_counts = df["Semantic_Class"].value_counts()
-print("Semantic classification:")
-print(sem_counts.to_string(), "\n")
-
-# Token classification stats
-tok_counts = df["Token_Class"].value_counts()
-print("Token classification:")
-print(tok_counts.to_string(), "\n")
-
-# Agreement between methods
-agreement = (df["Semantic_Class"] == df["Token_Class"]).sum()
-total = len(df)
-agreement_pct = (agreement / total) * 100 if total > 0 else 0
-
-print(f"Agreement between Semantic & Token classification: {agreement}/{total} ({agreement_pct:.2f}%)")
-import matplotlib.pyplot as plt
-
-
-plt.figure(figsize=(6, 4))
-df["Semantic_Class"].value_counts().plot(kind="bar")
-plt.title("Semantic Classification Distribution")
-plt.xlabel("Class")
-plt.ylabel("Number of Commits")
-plt.xticks(rotation=0)
-plt.tight_layout()
-plt.show()
-
-
-plt.figure(figsize=(6, 4))
-df["Token_Class"].value_counts().plot(kind="bar", color="orange")
-plt.title("Token Classification Distribution")
-plt.xlabel("Class")
-plt.ylabel("Number of Commits")
-plt.xticks(rotation=0)
-plt.tight_layout()
-plt.show()
-
-
-df["Classes_Agree"] = df.apply(
-    lambda row: "YES" if row["Semantic_Class"] == row["Token_Class"] else "NO", axis=1
-)
-
-plt.figure(figsize=(5, 5))
-df["Classes_Agree"].value_counts().plot(
-    kind="pie", autopct="%1.1f%%", startangle=90, colors=["#4CAF50", "#F44336"]
-)
-plt.ylabel("")
-plt.title("Agreement Between Semantic & Token Classifications")
-plt.tight_layout()
-plt.show()
-# Pie chart for classification agreement
-agreement_counts = df["Classes_Agree"].value_counts()
-
-plt.figure(figsize=(6, 6))
-plt.pie(
-    agreement_counts,
-    labels=agreement_counts.index,
-    autopct="%1.1f%%",
-    startangle=90,
-    colors=["#4CAF50", "#F44336"]
-)
-plt.title("Semantic vs Token Classification Agreement")
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+SCORE_COLUMNS = ["Commit Hash", "File Name", "Semantic_Similarity", "Token_Similarity",
+                 "Structural_Similarity"]
+
+
+def compute_semantic_similarities(engine, code_before, code_after):
+    """
+    Embed every before/after text in one batched pass, then score all rows
+    with a single vectorized cosine. Rows whose before and after text are
+    identical are 1.0 without touching the model.
+    """
+    # str() as the per-row version did, so missing code is embedded as "nan"
+    before = [str(t) for t in code_before]
+    after = [str(t) for t in code_after]
+    scores = np.ones(len(before))
+
+    changed = [i for i, (b, a) in enumerate(zip(before, after)) if b != a or not b.strip()]
+    if changed:
+        embeddings = engine.embed([before[i] for i in changed] + [after[i] for i in changed])
+        n = len(changed)
+        scores[changed] = cosine_similarity_rows(embeddings[:n], embeddings[n:])
+    return scores
+
+
+def classify(df):
+    df["Semantic_Class"] = df["Semantic_Similarity"].apply(lambda x: "Minor Fix" if x >= SEM_THRESHOLD else "Major Fix")
+    df["Token_Class"] = df["Token_Similarity"].apply(lambda x: "Minor Fix" if x >= TOK_THRESHOLD else "Major Fix")
+    df["Structural_Class"] = classify_structural(df["Structural_Similarity"].to_numpy(float))
+
+
+def print_report(df):
+    print("\n Similarity & Classification Report")
+    print("-" * 50)
+
+    # Semantic classification stats
+    sem_counts = df["Semantic_Class"].value_counts()
+    print("Semantic classification:")
+    print(sem_counts.to_string(), "\n")
+
+    # Token classification stats
+    tok_counts = df["Token_Class"].value_counts()
+    print("Token classification:")
+    print(tok_counts.to_string(), "\n")
+
+    # Agreement between methods
+    agreement = (df["Semantic_Class"] == df["Token_Class"]).sum()
+    total = len(df)
+    agreement_pct = (agreement / total) * 100 if total > 0 else 0
+
+    print(f"Agreement between Semantic & Token classification: {agreement}/{total} ({agreement_pct:.2f}%)")
+    print_structural_report(df)
+
+
+def plot_results(df):
+    plt.figure(figsize=(6, 4))
+    df["Semantic_Class"].value_counts().plot(kind="bar")
+    plt.title("Semantic Classification Distribution")
+    plt.xlabel("Class")
+    plt.ylabel("Number of Commits")
+    plt.xticks(rotation=0)
+    plt.tight_layout()
+    plt.show()
+
+
+    plt.figure(figsize=(6, 4))
+    df["Token_Class"].value_counts().plot(kind="bar", color="orange")
+    plt.title("Token Classification Distribution")
+    plt.xlabel("Class")
+    plt.ylabel("Number of Commits")
+    plt.xticks(rotation=0)
+    plt.tight_layout()
+    plt.show()
+
+
+    df["Classes_Agree"] = df.apply(
+        lambda row: "YES" if row["Semantic_Class"] == row["Token_Class"] else "NO", axis=1
+    )
+
+    plt.figure(figsize=(5, 5))
+    df["Classes_Agree"].value_counts().plot(
+        kind="pie", autopct="%1.1f%%", startangle=90, colors=["#4CAF50", "#F44336"]
+    )
+    plt.ylabel("")
+    plt.title("Agreement Between Semantic & Token Classifications")
+    plt.tight_layout()
+    plt.show()
+    # Pie chart for classification agreement
+    agreement_counts = df["Classes_Agree"].value_counts()
+
+    plt.figure(figsize=(6, 6))
+    plt.pie(
+        agreement_counts,
+        labels=agreement_counts.index,
+        autopct="%1.1f%%",
+        startangle=90,
+        colors=["#4CAF50", "#F44336"]
+    )
+    plt.title("Semantic vs Token Classification Agreement")
+    plt.tight_layout()
+    plt.show()
+
+
+def main(chunked=False, diff_tokens=False, backend="fp32"):
+    # Load dataset
+    print(f"Loading dataset: {input_file}")
+    text_columns = ["Source Code Before", "Source Code After"] + (["Diff"] if diff_tokens else [])
+    df = attach_text(pd.read_csv(input_file), ContentStore(), text_columns)
+
+    # CodeBERT for semantic similarity; the model itself is only loaded if some text is not cached
+    version = model_version(MODEL_NAME, backend)
+    cache = embedding_cache if backend == "fp32" else f"{embedding_cache}-{backend}"
+    store = EmbeddingStore(cache, model_name=version)
+    engine = EmbeddingEngine(store=store, backend=backend)
+    print(f"Embedding cache: {len(store)} texts already embedded")
+    if chunked:
+        # Whole files instead of their first 512 tokens; unchanged chunks come from the cache
+        engine = ChunkedEmbedder(engine)
+
+    # Pairs already scored with the same model / algorithm version come from the score store
+    scores = ScoreStore()
+    before, after = list(df["Source Code Before"]), list(df["Source Code After"])
+
+    print("Computing Semantic & Token similarities... (this may take time)")
+    semantic_version = version + ("+chunked" if chunked else "")
+    df["Semantic_Similarity"] = cached_scores(
+        scores, "Semantic_Similarity", semantic_version, df,
+        lambda rows: compute_semantic_similarities(engine, [before[i] for i in rows], [after[i] for i in rows]))
+    if chunked and engine.last_stats:
+        stats = engine.last_stats
+        print(f"Chunks: {stats['chunks']} total, {stats['distinct']} distinct, {stats['embedded']} embedded")
+    # BLEU-4 with method1 smoothing, identical to NLTK's sentence_bleu (see fast_bleu.py)
+    diffs = list(df["Diff"]) if diff_tokens else None
+
+    def token(rows):
+        if diff_tokens:
+            # Same scores, n-grams only counted around the diff hunks
+            return [diff_bleu(before[i], after[i], diffs[i]) for i in rows]
+        return bleu_scores([before[i] for i in rows], [after[i] for i in rows])
+
+    df["Token_Similarity"] = cached_scores(scores, "Token_Similarity", BLEU_VERSION, df, token)
+    # AST tree diff, Python files only (see structural_similarity.py)
+    df["Structural_Similarity"] = cached_structural(scores, df)
+
+    classify(df)
+
+    # Save with metrics
+    drop_text(df).to_csv(output_file, index=False)
+    print(f"Saved results with similarity metrics to {output_file}")
+    df[SCORE_COLUMNS].to_csv(scores_file, index=False)
+    print(f"Saved raw scores to {scores_file}")
+
+    print_report(df)
+    plot_results(df)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(chunked="--chunked" in args, diff_tokens="--diff-bleu" in args,
+         backend=args[args.index("--backend") + 1] if "--backend" in args else "fp32")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+AST-based structural change score: a third classifier next to the CodeBERT
+(semantic) and BLEU (token) ones.
+
+Every Python version is parsed and flattened into its normalized pre-order
+node sequence: node types only, identifiers dropped and constants reduced
+to their type, so renames and literal tweaks are not structural changes.
+Each node also gets a hash of its whole subtree (Merkle-style, bottom-up).
+
+Approximate tree edit distance between two versions:
+1. Subtrees whose hash occurs in both trees are unchanged; in pre-order a
+   subtree is a contiguous slice, so each maximal unchanged subtree collapses
+   to one token (weight = its size) with a set lookup, without walking it.
+2. The two short collapsed sequences are aligned (difflib); aligned tokens
+   count as matched nodes, the rest are inserts / deletes.
+
+    distance   = |A| + |B| - 2 * matched
+    similarity = 2 * matched / (|A| + |B|)
+
+Node sequences and subtree hashes are cached per blob, so a version shared
+by several rows is parsed once per worker. Only .py rows are scored or
+stored in the score store: the score depends on the file name as well as
+the content pair, so the same blobs under a non-.py name are NaN without a
+lookup.
+
+Usage: python structural_similarity.py [workers]   - add the columns to commit_similarity.csv
+"""
+
+import ast
+import difflib
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from content_store import ContentStore, attach_text, blob_hash, drop_text
+from score_store import ScoreStore, cached_scores
+
+input_file = "commit_similarity.csv"
+
+STRUCT_THRESHOLD = 0.9
+STRUCTURAL_VERSION = "ast-merkle-2"  # score version in the score store (-1 also held non-.py NaNs)
+
+_tree_cache = {}
+
+
+# ---------------- Normalized node sequences ---------------- #
+
+def node_label(node):
+    """Node type; constants keep only the type of their value"""
+    if isinstance(node, ast.Constant):
+        return f"Constant:{type(node.value).__name__}"
+    return type(node).__name__
+
+
+def child_nodes(node):
+    # Load / Store / Del contexts carry no structure of their own
+    return [c for c in ast.iter_child_nodes(node) if not isinstance(c, ast.expr_context)]
+
+
+def tree_nodes(tree):
+    """
+    Pre-order (labels, subtree sizes, subtree hashes) of a normalized AST.
+    The subtree of node i is nodes i .. i + sizes[i] - 1.
+    """
+    order, children = [], []
+    stack = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(order)
+        order.append(node)
+        children.append([])
+        if parent >= 0:
+            children[parent].append(index)
+        stack.extend((child, index) for child in reversed(child_nodes(node)))
+
+    labels = [node_label(node) for node in order]
+    sizes = [1] * len(order)
+    hashes = [b""] * len(order)
+    for i in range(len(order) - 1, -1, -1):  # children before parents
+        h = hashlib.blake2b(labels[i].encode(), digest_size=8)
+        for c in children[i]:
+            sizes[i] += sizes[c]
+            h.update(hashes[c])
+        hashes[i] = h.digest()
+    return labels, sizes, hashes
+
+
+def parse_nodes(text):
+    """Cached tree_nodes of a source text; None when it is not Python"""
+    key = blob_hash(text)
+    if key not in _tree_cache:
+        try:
+            _tree_cache[key] = tree_nodes(ast.parse(text))
+        except (SyntaxError, ValueError):
+            _tree_cache[key] = None
+    return _tree_cache[key]
+
+
+# ---------------- Tree diff ---------------- #
+
+def _collapse(labels, sizes, hashes, common):
+    """Pre-order tokens with every maximal common subtree as one weighted token"""
+    tokens, weights = [], []
+    i = 0
+    while i < len(labels):
+        if hashes[i] in common:
+            tokens.append(hashes[i])
+            weights.append(sizes[i])
+            i += sizes[i]
+        else:
+            tokens.append(labels[i])
+            weights.append(1)
+            i += 1
+    return tokens, weights
+
+
+def tree_distance(a, b):
+    """(approximate edit distance, similarity) between two tree_nodes results"""
+    common = set(a[2]) & set(b[2])
+    tokens_a, weights_a = _collapse(*a, common)
+    tokens_b, _ = _collapse(*b, common)
+    matcher = difflib.SequenceMatcher(None, tokens_a, tokens_b, autojunk=False)
+    matched = sum(sum(weights_a[m.a:m.a + m.size]) for m in matcher.get_matching_blocks())
+    total = len(a[0]) + len(b[0])
+    return total - 2 * matched, 2 * matched / total
+
+
+def structural_pair(pair):
+    """(distance, similarity) of one before / after pair; NaN when either is not Python"""
+    before, after = ("" if pd.isna(t) else t for t in pair)
+    a, b = parse_nodes(before), parse_nodes(after)
+    if a is None or b is None:
+        return np.nan, np.nan
+    return tree_distance(a, b)
+
+
+def python_rows(file_names):
+    """Positions of the rows whose file is Python source"""
+    return [i for i, name in enumerate(file_names) if str(name).endswith(".py")]
+
+
+def _pair_results(pairs, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [structural_pair(p) for p in pairs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(structural_pair, pairs, chunksize=8))
+
+
+def structural_scores(code_before, code_after, file_names, workers=None):
+    """(distances, similarities) for every row; non-.py rows are NaN"""
+    rows = python_rows(file_names)
+    results = _pair_results([(code_before[i], code_after[i]) for i in rows], workers)
+
+    distances = np.full(len(file_names), np.nan)
+    similarities = np.full(len(file_names), np.nan)
+    for i, (distance, similarity) in zip(rows, results):
+        distances[i], similarities[i] = distance, similarity
+    return distances, similarities
+
+
+def cached_structural(store, df, workers=None):
+    """Similarities of df's rows; the .py rows come from / go into the score store, the rest are NaN"""
+    rows = np.array(python_rows(df["File Name"]), np.int64)
+    before, after = df["Source Code Before"].to_numpy(), df["Source Code After"].to_numpy()
+    similarities = np.full(len(df), np.nan)
+    similarities[rows] = cached_scores(
+        store, "Structural_Similarity", STRUCTURAL_VERSION, df.iloc[rows],
+        lambda sub: [similarity for _, similarity in
+                     _pair_results([(before[rows[j]], after[rows[j]]) for j in sub], workers)])
+    return similarities
+
+
+def classify_structural(similarities):
+    """Minor / Major like the other two classifiers; N/A where there is no Python AST"""
+    return np.where(np.isnan(similarities), "N/A",
+                    np.where(similarities >= STRUCT_THRESHOLD, "Minor Fix", "Major Fix"))
+
+
+def print_report(df):
+    print("\n Structural Classification Report")
+    print("-" * 50)
+    print(df["Structural_Class"].value_counts().to_string(), "\n")
+    python_rows = df["Structural_Class"] != "N/A"
+    total = int(python_rows.sum())
+    for other in ("Semantic_Class", "Token_Class"):
+        agreement = int((df.loc[python_rows, "Structural_Class"] == df.loc[python_rows, other]).sum())
+        agreement_pct = (agreement / total) * 100 if total > 0 else 0
+        print(f"Agreement with {other} on Python files: {agreement}/{total} ({agreement_pct:.2f}%)")
+
+
+def main(workers=None):
+    print(f"Loading dataset: {input_file}")
+    df = attach_text(pd.read_csv(input_file), ContentStore())
+
+    start = time.perf_counter()
+    similarities = cached_structural(ScoreStore(), df, workers)
+    print(f"✓ Structural similarity for {np.isfinite(similarities).sum()} Python rows "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    df["Structural_Similarity"] = similarities
+    df["Structural_Class"] = classify_structural(similarities)
+    drop_text(df).to_csv(input_file, index=False)
+    print(f"Saved structural scores to {input_file}")
+    print_report(df)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Threshold sweep over the cached similarity scores.
+
+For every (semantic threshold, token threshold) pair on a grid, count how
+many rows each method calls Minor / Major and how often the two agree -
+without re-running CodeBERT or BLEU. Scores are bucketed once against each
+threshold axis; a 2D histogram with reversed cumulative sums then gives
+"semantic >= t_s and token >= t_t" for the whole grid at once.
+
+Usage: python threshold_sweep.py [grid size]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from similarity import SEM_THRESHOLD, TOK_THRESHOLD, scores_file, output_file
+
+sweep_file = "threshold_sweep.npz"
+heatmap_csv = "threshold_agreement.csv"
+
+
+def load_scores():
+    """similarity_scores.csv if present, else the full similarity output"""
+    try:
+        df = pd.read_csv(scores_file)
+    except FileNotFoundError:
+        df = pd.read_csv(output_file, usecols=["Semantic_Similarity", "Token_Similarity"])
+    return df["Semantic_Similarity"].to_numpy(float), df["Token_Similarity"].to_numpy(float)
+
+
+def sweep(semantic, token, sem_grid, tok_grid):
+    """
+    Minor = score >= threshold (as in similarity.classify). Returns a dict of
+    arrays: sem_minor (S,), tok_minor (T,), both_minor (S, T), agreement (S, T).
+    """
+    total = len(semantic)
+    # bucket k holds scores with exactly k grid thresholds <= score,
+    # i.e. score >= grid[i] <=> bucket > i
+    sem_bucket = np.searchsorted(sem_grid, semantic, side="right")
+    tok_bucket = np.searchsorted(tok_grid, token, side="right")
+
+    hist = np.zeros((len(sem_grid) + 1, len(tok_grid) + 1), dtype=np.int64)
+    np.add.at(hist, (sem_bucket, tok_bucket), 1)
+    # suffix[a, b] = rows with sem bucket >= a and tok bucket >= b
+    suffix = hist[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+
+    both_minor = suffix[1:, 1:]
+    sem_minor = suffix[1:, 0]
+    tok_minor = suffix[0, 1:]
+    both_major = total - sem_minor[:, None] - tok_minor[None, :] + both_minor
+    return {
+        "sem_grid": sem_grid,
+        "tok_grid": tok_grid,
+        "sem_minor": sem_minor,
+        "sem_major": total - sem_minor,
+        "tok_minor": tok_minor,
+        "tok_major": total - tok_minor,
+        "both_minor": both_minor,
+        "agreement": both_minor + both_major,
+        "total": np.int64(total),
+    }
+
+
+def plot_heatmap(result):
+    total = max(int(result["total"]), 1)
+    plt.figure(figsize=(7, 6))
+    plt.imshow(result["agreement"] / total * 100, origin="lower", aspect="auto", cmap="viridis",
+               extent=[result["tok_grid"][0], result["tok_grid"][-1],
+                       result["sem_grid"][0], result["sem_grid"][-1]])
+    plt.colorbar(label="Agreement (%)")
+    plt.scatter([TOK_THRESHOLD], [SEM_THRESHOLD], color="red", marker="x", label="Current thresholds")
+    plt.xlabel("Token threshold")
+    plt.ylabel("Semantic threshold")
+    plt.title("Semantic vs Token Classification Agreement")
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+def main(grid_size=100):
+    semantic, token = load_scores()
+    print(f"Loaded {len(semantic)} scored rows")
+
+    grid = np.linspace(0.0, 1.0, grid_size)
+    start = time.perf_counter()
+    result = sweep(semantic, token, grid, grid)
+    elapsed = time.perf_counter() - start
+    print(f"Swept {grid_size}x{grid_size} thresholds in {elapsed * 1000:.2f} ms")
+
+    np.savez(sweep_file, **result)
+    pd.DataFrame(result["agreement"] / max(int(result["total"]), 1) * 100,
+                 index=pd.Index(grid.round(4), name="Semantic Threshold"),
+                 columns=grid.round(4)).to_csv(heatmap_csv)
+    print(f"Saved sweep arrays to {sweep_file} and heatmap data to {heatmap_csv}")
+
+    current = sweep(semantic, token, np.array([SEM_THRESHOLD]), np.array([TOK_THRESHOLD]))
+    print(f"Agreement at current thresholds ({SEM_THRESHOLD}, {TOK_THRESHOLD}): "
+          f"{current['agreement'][0, 0]}/{current['total']}")
+    best = np.unravel_index(np.argmax(result["agreement"]), result["agreement"].shape)
+    print(f"Best agreement: {result['agreement'][best]}/{result['total']} at "
+          f"semantic >= {grid[best[0]]:.3f}, token >= {grid[best[1]]:.3f}")
+    plot_heatmap(result)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
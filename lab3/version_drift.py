@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Version x version similarity per file, for evolution / drift analysis.
+
+Every stored version of a file (lab2 commit_diffs.csv, in commit order) is
+looked up in the embedding cache by text SHA; the cosine matrix of all its
+versions is one normalised matrix product. Only the strict upper triangle
+is kept, as float16, in one flat array with CSR-style offsets per file.
+
+Usage: python version_drift.py [--cached-only] [N files to plot]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from embedding_engine import EmbeddingEngine, MODEL_NAME
+from embedding_store import EmbeddingStore, text_sha
+
+lab2_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lab2")
+diffs_csv = os.path.join(lab2_dir, "commit_diffs.csv")
+embedding_cache = "embedding_cache"
+output_file = "version_similarity.npz"
+
+
+def _read(relative_path):
+    path = os.path.join(lab2_dir, str(relative_path))
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def file_histories(csv_path=diffs_csv):
+    """
+    {file key: [(commit hash, text)]} in commit order. The key is the repo
+    path from the "File Path" column (written by lab2/diffs_gen.py). An older
+    CSV without it is keyed by file name: names that occur twice in one
+    commit are different files and are skipped, and files that share a name
+    across commits can still be merged, so a warning is printed. Consecutive
+    identical versions are collapsed; deleted versions are skipped.
+    """
+    df = pd.read_csv(csv_path)
+    if "File Path" in df.columns:
+        key_column = "File Path"
+    else:
+        key_column = "File Name"
+        repeated = df.duplicated(["Commit Hash", "File Name"], keep=False)
+        ambiguous = set(df.loc[repeated, "File Name"])
+        df = df[~df["File Name"].isin(ambiguous)]
+        print(f"⚠️ {os.path.basename(csv_path)} has no 'File Path' column: histories are keyed by file name "
+              f"(regenerate it with lab2/diffs_gen.py for per-path histories)")
+        if ambiguous:
+            print(f"⚠️ Skipped {len(ambiguous)} file names shared by several files of one commit: "
+                  f"{', '.join(sorted(ambiguous)[:5])}{' ...' if len(ambiguous) > 5 else ''}")
+    histories = {}
+    for row in df.to_dict("records"):
+        key = row[key_column] if not pd.isna(row[key_column]) else row["File Name"]
+        versions = histories.setdefault(key, [])
+        if not versions:
+            before = _read(row["Source Code Before File Path"])
+            if before and before.strip():
+                versions.append((row["Commit Hash"] + "^", before))
+        after = _read(row["Source Code After File Path"])
+        if after and after.strip() and (not versions or versions[-1][1] != after):
+            versions.append((row["Commit Hash"], after))
+    return histories
+
+
+def upper_triangle(vectors):
+    """Strict upper triangle of the cosine matrix, row-major, float16"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    sims = unit @ unit.T
+    return sims[np.triu_indices(len(vectors), 1)].astype(np.float16)
+
+
+def full_matrix(tri, n):
+    """Rebuild the symmetric n x n matrix (diagonal 1) from upper_triangle output"""
+    m = np.eye(n, dtype=np.float32)
+    rows, cols = np.triu_indices(n, 1)
+    m[rows, cols] = tri
+    m[cols, rows] = tri
+    return m
+
+
+def compute(histories, store):
+    """Similarity triangles for every file with >= 2 embedded versions in the store"""
+    keys, commits, shas, triangles, counts = [], [], [], [], []
+    for key, versions in histories.items():
+        version_shas = [text_sha(text) for _, text in versions]
+        vectors, found = store.get(version_shas)
+        if found.sum() < 2:
+            continue
+        keys.append(key)
+        commits.append([c for (c, _), ok in zip(versions, found) if ok])
+        shas.append([s for s, ok in zip(version_shas, found) if ok])
+        triangles.append(upper_triangle(vectors[found]))
+        counts.append(int(found.sum()))
+    return keys, commits, shas, triangles, counts
+
+
+def save(path, keys, commits, shas, triangles, counts):
+    np.savez_compressed(
+        path,
+        files=np.array(keys, dtype=str),
+        version_counts=np.array(counts, dtype=np.int64),
+        version_ptr=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        commits=np.array([c for cs in commits for c in cs], dtype=str),
+        shas=np.array([s for ss in shas for s in ss], dtype=str),
+        tri_ptr=np.concatenate([[0], np.cumsum([len(t) for t in triangles])]).astype(np.int64),
+        similarities=np.concatenate(triangles) if triangles else np.zeros(0, np.float16),
+    )
+
+
+def plot_drift(keys, triangles, counts, top=5):
+    """Similarity of every version to the first one and to the previous one"""
+    order = np.argsort(counts)[::-1][:top]
+    fig, axes = plt.subplots(1, 2, figsize=(12, 4))
+    for i in order:
+        m = full_matrix(triangles[i], counts[i])
+        axes[0].plot(m[0], label=f"{keys[i]} ({counts[i]})")
+        axes[1].plot(np.arange(1, counts[i]), np.diagonal(m, 1), label=keys[i])
+    axes[0].set_title("Similarity to first version")
+    axes[1].set_title("Similarity to previous version")
+    for ax in axes:
+        ax.set_xlabel("Version")
+        ax.set_ylabel("Cosine similarity")
+    axes[0].legend(fontsize=7)
+    plt.tight_layout()
+    plt.show()
+
+
+def main(cached_only=False, top=5):
+    print(f"Loading file histories from {diffs_csv}")
+    histories = file_histories()
+    total = sum(len(v) for v in histories.values())
+    print(f"{len(histories)} files, {total} versions")
+
+    store = EmbeddingStore(embedding_cache, model_name=MODEL_NAME)
+    if not cached_only:
+        # Embed what the cache is missing first, so the timing below is the drift computation alone
+        start = time.perf_counter()
+        EmbeddingEngine(store=store).embed([text for versions in histories.values() for _, text in versions])
+        print(f"Embeddings ready in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    keys, commits, shas, triangles, counts = compute(histories, store)
+    print(f"Matrices for {len(keys)} files in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(largest: {max(counts, default=0)} versions)")
+
+    save(output_file, keys, commits, shas, triangles, counts)
+    print(f"Saved upper-triangular float16 similarities to {output_file}")
+    plot_drift(keys, triangles, counts, top)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--cached-only"]
+    main(cached_only="--cached-only" in sys.argv[1:], top=int(args[0]) if args else 5)
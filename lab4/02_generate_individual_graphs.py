@@ -3,8 +3,14 @@
 Part (e) - Statistical Analysis of Final Dataset
 """
 
+import os
+import sys
+
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import load  # noqa: E402
+
 def classify_file(filepath):
     """Identify the type of file based on its path/name"""
     if pd.isna(filepath) or filepath.strip() == "":
@@ -26,7 +32,7 @@ def perform_statistics():
     print("=" * 70)
 
     try:
-        dataset = pd.read_csv("part_d_dataset.csv")
+        dataset = load("part_d")
         print(f" Loaded dataset with {len(dataset)} rows and {len(dataset.columns)} columns")
     except Exception as err:
         print(f" Could not load dataset: {err}")
@@ -3,10 +3,16 @@
 Part (e) - Generate Six Graphs for Final Report
 """
 
+import os
+import sys
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import load  # noqa: E402
+
 # -------------------------------
 # Helper Function
 # -------------------------------
@@ -184,7 +190,7 @@ def main():
     print("=" * 50)
 
     try:
-        data = pd.read_csv("part_d_dataset.csv")
+        data = load("part_d")
         print(f"Dataset Loaded Successfully: {len(data)} rows")
     except Exception as e:
         print(f"Error: {e}")
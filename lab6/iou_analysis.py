@@ -4,6 +4,9 @@ Pairwise Agreement (IoU) Analysis for Security Tools
 Computes Jaccard Index (Intersection over Union) for tool pairs
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -11,12 +14,15 @@ import seaborn as sns
 from itertools import combinations
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lab_datasets import load  # noqa: E402
+
 def load_and_prepare_data():
     """Load consolidated findings and prepare CWE sets for each tool"""
     print("📊 Loading consolidated findings for IoU analysis...")
     
     # Load consolidated findings
-    df = pd.read_csv('consolidated_findings.csv')
+    df = load("consolidated_findings")
     
     # Normalize CWE IDs to consistent format
     def normalize_cwe_id(cwe_id):
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+The CSV datasets shared by the lab analyses, registered in one place.
+
+Every dataset has a path relative to the repository root and a schema:
+low-cardinality columns (repository, tool, fix type, file extension) are
+categories, free text (messages, paths, diffs) is Arrow-backed strings, and
+the rest is numeric / bool. They are parsed with pyarrow's multithreaded
+CSV reader when pyarrow is installed, and each dataset is parsed once per
+process - load() hands out cheap copies of the memoized frame. Derived
+columns (e.g. "Extension") are only added when asked for with derived=True,
+so by default a frame has exactly the CSV's columns.
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from lab_datasets import load
+    df = load("commit_predictions")
+    df = load("commit_predictions", derived=True)  # plus "Extension"
+
+Usage: python lab_datasets.py    - parse time and memory, plain read_csv vs typed,
+                                   per dataset and per consumer script
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    ENGINE = "pyarrow"
+    TEXT = pd.StringDtype("pyarrow", na_value=np.nan)  # missing values stay NaN, as with object columns
+except ImportError:
+    ENGINE = "c"
+    TEXT = object
+
+CATEGORY = "category"
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# derived: new column -> (source column, function of one value); derived columns are categories
+Dataset = namedtuple("Dataset", ["path", "dtypes", "derived"])
+
+
+def file_extension(fname):
+    return fname.split(".")[-1] if isinstance(fname, str) and "." in fname else None
+
+
+DATASETS = {
+    "bug_fixing_commits": Dataset("lab2/bug_fixing_commits.csv", {
+        "Hash": TEXT,
+        "Message": TEXT,
+        "Hashes of parents": TEXT,
+        "Is a merge commit?": bool,
+        "List of modified files": TEXT,
+    }, {}),
+    "commit_predictions": Dataset("lab2/commit_predictions.csv", {
+        "Commit Hash": TEXT,
+        "Commit Message": TEXT,
+        "File Name": CATEGORY,
+        "Source Code Before File Path": TEXT,
+        "Source Code After File Path": TEXT,
+        "Diff File Path": TEXT,
+        "LLM Inference (fix type)": CATEGORY,
+        "Rectified Message": TEXT,
+    }, {"Extension": ("File Name", file_extension)}),
+    "commit_diffs": Dataset("lab2/commit_diffs.csv", {
+        "Commit Hash": TEXT,
+        "Commit Message": TEXT,
+        "File Name": CATEGORY,
+        "Source Code Before File Path": TEXT,
+        "Source Code After File Path": TEXT,
+        "Diff File Path": TEXT,
+    }, {"Extension": ("File Name", file_extension)}),
+    "part_c": Dataset("lab4/part_c_dataset.csv", {
+        "old_file": TEXT,
+        "new_file": TEXT,
+        "commit_sha": TEXT,
+        "parent_sha": TEXT,
+        "commit_date": TEXT,
+        "commit_author": CATEGORY,
+        "commit_message": TEXT,
+        "diff_myers": TEXT,
+        "diff_hist": TEXT,
+        "repository": CATEGORY,
+    }, {}),
+    "part_d": Dataset("lab4/part_d_dataset.csv", {
+        "old_file": TEXT,
+        "new_file": TEXT,
+        "commit_sha": TEXT,
+        "parent_sha": TEXT,
+        "commit_date": TEXT,
+        "commit_author": CATEGORY,
+        "commit_message": TEXT,
+        "diff_myers": TEXT,
+        "diff_hist": TEXT,
+        "repository": CATEGORY,
+        "Discrepancy": CATEGORY,
+    }, {}),
+    "consolidated_findings": Dataset("lab6/consolidated_findings.csv", {
+        "Project_name": CATEGORY,
+        "Tool_name": CATEGORY,
+        "CWE_ID": TEXT,  # "78" and "CWE-78" both occur
+        "Number_of_Findings": np.int64,
+        "Is_In_CWE_Top_25": CATEGORY,
+    }, {}),
+}
+
+# script -> the datasets it load()s, for the per-consumer benchmark
+CONSUMERS = {
+    "lab2/rq_analysis.py": ["bug_fixing_commits", "commit_predictions"],
+    "lab3/load_data.py": ["bug_fixing_commits", "commit_predictions"],
+    "lab3/baseline_stats.py": ["bug_fixing_commits", "commit_predictions"],
+    "lab3/check.py": ["commit_predictions"],
+    "lab4/02_generate_individual_graphs.py": ["part_d"],
+    "lab4/03_generate_statistics.py": ["part_d"],
+    "lab6/iou_analysis.py": ["consolidated_findings"],
+}
+
+_loaded = {}
+
+
+def dataset_path(name):
+    return os.path.join(ROOT, DATASETS[name].path)
+
+
+# read_csv's default missing-value markers, so both engines agree on NaN
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+             "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+
+def _read_arrow(path, dtypes):
+    # pandas' engine="pyarrow" cannot parse quoted multi-line cells (commit messages),
+    # so the Arrow reader is called directly with newlines_in_values
+    text_columns = {c: pa.string() for c, dtype in dtypes.items() if dtype is TEXT or dtype == CATEGORY}
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types=text_columns, null_values=NA_VALUES,
+                                              strings_can_be_null=True),
+    )
+    return table.to_pandas().astype(dtypes)
+
+
+def read(name, engine=ENGINE, derived=False):
+    """Parse a registered dataset with its schema (not memoized)"""
+    spec = DATASETS[name]
+    if engine == "pyarrow":
+        df = _read_arrow(dataset_path(name), spec.dtypes)
+    else:
+        df = pd.read_csv(dataset_path(name), dtype=spec.dtypes, engine=engine)
+    if not derived:
+        return df
+    for column, (source, func) in spec.derived.items():
+        df[column] = df[source].map(func).astype(CATEGORY)
+    return df
+
+
+def load(name, derived=False):
+    """
+    Typed dataset, parsed on the first call in this process. Callers get a
+    shallow copy: with copy-on-write, changing it never touches the memo.
+    derived=True adds the dataset's derived columns to the CSV's own.
+    """
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}' (known: {', '.join(DATASETS)})")
+    key = (name, derived)
+    if key not in _loaded:
+        _loaded[key] = read(name, derived=derived)
+    return _loaded[key].copy(deep=False)
+
+
+def _best_time(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark():
+    print(f"{'Dataset':<24}{'Rows':>7}{'Plain ms':>10}{'Typed ms':>10}{'Plain MB':>10}{'Typed MB':>10}")
+    results = {}  # dataset -> (plain s, typed s, plain MB, typed MB)
+    for name in DATASETS:
+        if not os.path.exists(dataset_path(name)):
+            print(f"⚠️ {DATASETS[name].path} not found, skipping")
+            continue
+        plain_time, plain = _best_time(lambda: pd.read_csv(dataset_path(name)))
+        typed_time, typed = _best_time(lambda: read(name))
+        plain_mb = plain.memory_usage(deep=True).sum() / 1e6
+        typed_mb = typed.memory_usage(deep=True).sum() / 1e6
+        results[name] = (plain_time, typed_time, plain_mb, typed_mb)
+        print(f"{name:<24}{len(typed):>7}{plain_time * 1e3:>10.1f}{typed_time * 1e3:>10.1f}"
+              f"{plain_mb:>10.2f}{typed_mb:>10.2f}")
+
+    # A consumer pays for each dataset it loads; totals of the rows above
+    print(f"\n{'Consumer':<40}{'Plain ms':>10}{'Typed ms':>10}{'Plain MB':>10}{'Typed MB':>10}")
+    for script, names in CONSUMERS.items():
+        if not all(n in results for n in names):
+            print(f"⚠️ {script}: dataset missing, skipping")
+            continue
+        plain_time, typed_time, plain_mb, typed_mb = np.sum([results[n] for n in names], axis=0)
+        print(f"{script:<40}{plain_time * 1e3:>10.1f}{typed_time * 1e3:>10.1f}"
+              f"{plain_mb:>10.2f}{typed_mb:>10.2f}")
+    load("commit_predictions")
+    start = time.perf_counter()
+    load("commit_predictions")
+    print(f"✓ Memoized load: {(time.perf_counter() - start) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    benchmark()